@@ -3,13 +3,76 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _parse_map(value: str) -> dict[str, str]:
+    """Parse "key:value,key2:value2" env strings into a dict."""
+    result = {}
+    for item in value.split(","):
+        if ":" in item:
+            key, val = item.split(":", 1)
+            result[key.strip()] = val.strip().lower()
+    return result
+
+
 class Settings:
     DB_HOST = os.getenv("DB_HOST", "localhost")
     DB_PORT = int(os.getenv("DB_PORT", "3306"))
     DB_USER = os.getenv("DB_USER", "root")
     DB_PASS = os.getenv("DB_PASS", "")
     DB_NAME = os.getenv("DB_NAME", "fastapi_db")
+    # lets the server read client files; only needed for INGEST_MODE/INGEST_TABLE_MODES/folder "bulk"
+    DB_LOCAL_INFILE = os.getenv("DB_LOCAL_INFILE", "false").lower() == "true"
     INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "5000"))
+    # "batch" (executemany INSERT) or "bulk" (LOAD DATA LOCAL INFILE)
+    INGEST_MODE = os.getenv("INGEST_MODE", "batch").lower()
+    INGEST_TABLE_MODES = _parse_map(os.getenv("INGEST_TABLE_MODES", ""))  # e.g. "scans_a:bulk,scans_b:batch"
+    # "csv" (stdlib reader) or "pandas" (chunked C engine)
+    CSV_PARSER = os.getenv("CSV_PARSER", "csv").lower()
+    CSV_TABLE_PARSERS = _parse_map(os.getenv("CSV_TABLE_PARSERS", ""))  # e.g. "scans_a:pandas"
+    INGEST_TMP_DIR = os.getenv("INGEST_TMP_DIR") or None
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+    INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1000"))
+    INGEST_TABLE_CONCURRENCY = int(os.getenv("INGEST_TABLE_CONCURRENCY", "2"))  # jobs per target table
+    SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "300"))  # seconds
+    # folder watching: "events" (watchfiles/inotify), "poll" (adaptive polling) or "auto"
+    WATCH_MODE = os.getenv("WATCH_MODE", "auto").lower()
+    WATCH_DEBOUNCE_MS = int(os.getenv("WATCH_DEBOUNCE_MS", "50"))
+    WATCH_RESCAN_SECONDS = float(os.getenv("WATCH_RESCAN_SECONDS", "60"))
+    POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "1"))
+    POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "30"))
+    # a file is ingested once size/mtime are unchanged for this long (or it can be opened exclusively)
+    FILE_QUIET_SECONDS = float(os.getenv("FILE_QUIET_SECONDS", "2"))
+    # a file that fails to ingest is retried after INGEST_RETRY_MIN_SECONDS, doubling up to the max
+    INGEST_RETRY_MIN_SECONDS = float(os.getenv("INGEST_RETRY_MIN_SECONDS", "5"))
+    INGEST_RETRY_MAX_SECONDS = float(os.getenv("INGEST_RETRY_MAX_SECONDS", "600"))
+    FILE_LOCK_PROBE = os.getenv("FILE_LOCK_PROBE", "true" if os.name == "nt" else "false").lower() == "true"
+    ARCHIVE_WORKERS = int(os.getenv("ARCHIVE_WORKERS", "2"))
+    ARCHIVE_QUEUE_SIZE = int(os.getenv("ARCHIVE_QUEUE_SIZE", "1000"))
+    ARCHIVE_RETRIES = int(os.getenv("ARCHIVE_RETRIES", "3"))
+    ARCHIVE_COMPRESS = os.getenv("ARCHIVE_COMPRESS", "false").lower() == "true"  # gzip the COPY_FILE_PATH copy
+    ARCHIVE_DRAIN_SECONDS = float(os.getenv("ARCHIVE_DRAIN_SECONDS", "10"))
+    # "raw" scans the data tables, "rollup" answers dashboard counts from scan_rollups
+    # (only complete once `python -m app.services.rollups backfill` has run)
+    DASHBOARD_SOURCE = os.getenv("DASHBOARD_SOURCE", "raw").lower()
+    # raw dashboard queries: per-table counts run on this many pooled connections,
+    # or as a single UNION ALL when there are at most DASHBOARD_UNION_MAX_TABLES tables
+    DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "4"))
+    DASHBOARD_UNION_MAX_TABLES = int(os.getenv("DASHBOARD_UNION_MAX_TABLES", "8"))
+    DASHBOARD_QUERY_TIMEOUT_MS = int(os.getenv("DASHBOARD_QUERY_TIMEOUT_MS", "5000"))
+    # dashboard responses are cached this long unless an ingest invalidates them; 0 disables
+    DASHBOARD_CACHE_TTL = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+    # data-table list is reconciled with the database this often (tables created outside the API)
+    TABLE_REGISTRY_REFRESH_SECONDS = float(os.getenv("TABLE_REGISTRY_REFRESH_SECONDS", "300"))
+    # /tables/searchall: tables searched concurrently and the overall time limit
+    SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+    SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "10"))
+    # /tables/image/file: LRU of resolved image paths + stat results, and browser cache lifetime
+    IMAGE_CACHE_SIZE = int(os.getenv("IMAGE_CACHE_SIZE", "2048"))
+    IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "60"))
+    IMAGE_MAX_AGE = int(os.getenv("IMAGE_MAX_AGE", "3600"))
+    # /tables/image/batch: resolver threads and the largest accepted batch
+    IMAGE_BATCH_WORKERS = int(os.getenv("IMAGE_BATCH_WORKERS", "8"))
+    IMAGE_BATCH_MAX_ITEMS = int(os.getenv("IMAGE_BATCH_MAX_ITEMS", "200"))
     FILE_GLOB = os.getenv("FILE_GLOB", "*.csv")
     COPY_FILE_PATH= os.getenv("COPY_FILE_PATH","D:\Surykant\Python\Test data\Done")
     
@@ -14,6 +14,8 @@ engine = create_engine(
     pool_recycle=3600,
     pool_size=10,
     max_overflow=20,
+    # required client-side for LOAD DATA LOCAL INFILE (bulk ingest mode)
+    connect_args={"local_infile": settings.DB_LOCAL_INFILE},
 )
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -0,0 +1,29 @@
+import logging
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+from app.database.connection import Base
+
+
+def add_missing_columns(engine: Engine) -> None:
+    """Add model columns that are missing from already-created tables.
+
+    `create_all` only creates tables that don't exist yet, so columns added to
+    the models later never reach existing databases without this step.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE `{table.name}` ADD COLUMN {ddl}"))
+                logging.info(f"Added missing column `{table.name}`.`{column.name}`")
@@ -15,5 +15,8 @@ class Folder(Base):
     created_at = Column(DateTime, server_default=func.now())
     scanner_id = Column(String(10), nullable=False) 
     table_name = Column(String(100), nullable=False)
+    ingest_mode = Column(String(10), nullable=True)  # overrides table/global ingest mode
+    watch_mode = Column(String(10), nullable=True)  # "auto", "events" or "poll"; None -> WATCH_MODE
+    encoding = Column(String(40), nullable=True)  # learned CSV encoding profile
     
     processed_files = relationship("ProcessedFile", back_populates="folder", cascade="all, delete")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, CHAR, DateTime, Index, ForeignKey, Boolean, UniqueConstraint
+from sqlalchemy import BigInteger, Column, Integer, String, CHAR, DateTime, Index, ForeignKey, Boolean, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database.connection import Base
@@ -14,6 +14,7 @@ class ProcessedFile(Base):
     processed = Column(Boolean, default=False, index=True)
     error = Column(String(255), nullable=True)
     mtime = Column(DateTime, nullable=True)   # file modified time
+    size = Column(BigInteger, nullable=True)  # file size in bytes when recorded
     created_at = Column(DateTime, server_default=func.now())
 
     folder_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -0,0 +1,20 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, Integer, String, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+
+class ScanRollup(Base):
+    """Rows ingested per data table, scanner and day; maintained by ingest_csv."""
+
+    __tablename__ = "scan_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String(100), nullable=False)
+    scanner_id = Column(String(64), nullable=False)
+    day = Column(Date, nullable=False, index=True)
+    row_count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("table_name", "scanner_id", "day", name="uq_rollup_key"),
+    )
@@ -0,0 +1,18 @@
+from typing import Callable
+from sqlalchemy import Table
+from sqlalchemy.dialects import mysql, sqlite
+
+
+def upsert_stmt(table: Table, dialect_name: str, index_elements: list[str], set_: Callable):
+    """INSERT that updates on key conflict, for executemany use.
+
+    `set_` receives the proxy for the incoming row (`inserted` on MySQL,
+    `excluded` on SQLite) and the table columns, and returns the SET mapping.
+    """
+    if dialect_name == "mysql":
+        stmt = mysql.insert(table)
+        return stmt.on_duplicate_key_update(set_(stmt.inserted, table.c))
+    if dialect_name == "sqlite":
+        stmt = sqlite.insert(table)
+        return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded, table.c))
+    raise NotImplementedError(f"Upsert is not supported for dialect '{dialect_name}'")
@@ -0,0 +1,107 @@
+"""Cheap row-count estimates for the dashboard tiles.
+
+Totals come from information_schema.TABLES.TABLE_ROWS (InnoDB statistics,
+no table scan). Today's rows come from scan_rollups, which every ingest
+updates in its own transaction, so the figure survives restarts and covers
+all ingesting processes. Every exact count is remembered together with the
+estimate at that moment, which gives the error bound returned with the
+next estimates.
+"""
+from datetime import date, datetime
+from threading import Lock
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+from app.database.models.scanrollup import ScanRollup
+from app.services.tableregistry import table_registry
+
+_lock = Lock()
+_ingested_total = 0
+
+
+class _ExactCount:
+    def __init__(self, value: int, estimate: int | None, ingested_marker: int):
+        self.value = value
+        self.estimate = estimate
+        self.ingested_marker = ingested_marker
+        self.measured_at = datetime.now()
+
+
+# "total" / date -> last exact count
+_exact: dict = {}
+
+
+def record_ingest(rows: int) -> None:
+    """Called by the watcher after a file's rows are committed."""
+    global _ingested_total
+    if not rows:
+        return
+    with _lock:
+        _ingested_total += rows
+
+
+def table_rows_estimate(db: Session) -> int:
+    rows = db.execute(text("""
+        SELECT table_name, table_rows FROM information_schema.tables
+        WHERE table_schema = DATABASE()
+    """)).fetchall()
+    tables = set(table_registry.tables(db.get_bind()))
+    return sum(int(cnt or 0) for name, cnt in rows if name in tables)
+
+
+def record_exact_total(db: Session, value: int) -> None:
+    estimate = table_rows_estimate(db)
+    with _lock:
+        _exact["total"] = _ExactCount(value, estimate, _ingested_total)
+
+
+def record_exact_today(db: Session, value: int) -> None:
+    today = date.today()
+    estimate = rollup_rows_today(db)
+    with _lock:
+        for key in [k for k in _exact if isinstance(k, date) and k != today]:
+            del _exact[key]
+        _exact[today] = _ExactCount(value, estimate, 0)
+
+
+def _error_bound(key, ingested_now: int | None = None) -> dict | None:
+    with _lock:
+        exact = _exact.get(key)
+    if exact is None:
+        return None
+    bound = {
+        "last_exact": exact.value,
+        "last_exact_at": exact.measured_at.isoformat(timespec="seconds"),
+    }
+    if ingested_now is not None:
+        # rows ingested by this process since then, i.e. not yet verified
+        bound["rows_ingested_since"] = ingested_now - exact.ingested_marker
+    if exact.estimate is not None:
+        bound["estimate_at_last_exact"] = exact.estimate
+        bound["relative_error"] = round(abs(exact.estimate - exact.value) / exact.value, 4) if exact.value else 0.0
+    return bound
+
+
+def rollup_rows_today(db: Session) -> int:
+    # same day boundary as rollups.add_rows, which writes CURRENT_DATE()
+    total = db.execute(
+        select(func.sum(ScanRollup.row_count)).where(ScanRollup.day == func.current_date())
+    ).scalar()
+    return int(total or 0)
+
+
+def approx_total_data_rows(db: Session) -> dict:
+    with _lock:
+        ingested_now = _ingested_total
+    return {
+        "total_data_rows": table_rows_estimate(db),
+        "source": "table_rows",
+        "error_bound": _error_bound("total", ingested_now),
+    }
+
+
+def approx_todays_data_rows(db: Session) -> dict:
+    return {
+        "todays_data_rows": rollup_rows_today(db),
+        "source": "scan_rollups",
+        "error_bound": _error_bound(date.today()),
+    }
@@ -0,0 +1,175 @@
+import os
+import gzip
+import time
+import shutil
+import logging
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+
+
+class ArchiveJob:
+    """Copy an ingested CSV to the backup location, then move it into Done/."""
+
+    def __init__(self, src: str, copy_dest: str, done_dest: str):
+        self.src = src
+        self.copy_dest = copy_dest
+        self.done_dest = done_dest
+        self.enqueued_at = time.monotonic()
+
+
+class Archiver:
+    """Post-ingest copy/move stage with its own bounded queue and thread pool.
+
+    Uses os.link / os.replace when source and destination share a
+    filesystem and only falls back to a real copy across filesystems.
+    Failed jobs are retried with exponential backoff.
+    """
+
+    def __init__(self, workers: int, max_queued: int, retries: int, compress: bool):
+        self.workers = workers
+        self.retries = retries
+        self.compress = compress
+        self._queue: Queue = Queue(maxsize=max_queued)
+        self._threads: list[Thread] = []
+        self._lock = Lock()
+        # sources queued or being archived, so re-submits from a rescan are dropped
+        self._active: set[str] = set()
+        self._stopping = False
+
+        self._archived = 0
+        self._failed = 0
+        self._retried = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._lag_last = 0.0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                t = Thread(target=self._work, name=f"archiver-{i}", daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def stop(self, drain_timeout: float = 0) -> None:
+        """Stop workers, first giving queued jobs up to `drain_timeout` seconds."""
+        deadline = time.monotonic() + drain_timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.1)
+        with self._lock:
+            self._stopping = True
+            self._threads = []
+
+    def submit(self, job: ArchiveJob, timeout: float | None = None) -> bool:
+        """False if the queue is full; a source that is already queued is not added twice."""
+        with self._lock:
+            if job.src in self._active:
+                return True
+            self._active.add(job.src)
+        try:
+            self._queue.put(job, timeout=timeout)
+            return True
+        except Full:
+            with self._lock:
+                self._active.discard(job.src)
+            return False
+
+    def is_pending(self, src: str) -> bool:
+        with self._lock:
+            return src in self._active
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._archived
+            return {
+                "queue_depth": self._queue.qsize(),
+                "archived": done,
+                "failed": self._failed,
+                "retried": self._retried,
+                # ingest commit -> file archived
+                "lag_seconds_avg": round(self._lag_total / done, 3) if done else 0.0,
+                "lag_seconds_max": round(self._lag_max, 3),
+                "lag_seconds_last": round(self._lag_last, 3),
+            }
+
+    def _work(self) -> None:
+        while not self._stopping:
+            try:
+                job = self._queue.get(timeout=1)
+            except Empty:
+                continue
+            try:
+                self._run(job)
+            finally:
+                with self._lock:
+                    self._active.discard(job.src)
+                self._queue.task_done()
+
+    def _run(self, job: ArchiveJob) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                self._archive(job)
+                lag = time.monotonic() - job.enqueued_at
+                with self._lock:
+                    self._archived += 1
+                    self._lag_total += lag
+                    self._lag_last = lag
+                    self._lag_max = max(self._lag_max, lag)
+                return
+            except Exception as e:
+                if attempt == self.retries:
+                    logging.error(f"Failed to archive {job.src} after {attempt + 1} attempts: {e}")
+                    with self._lock:
+                        self._failed += 1
+                    return
+                logging.warning(f"Archiving {job.src} failed ({e}); retrying")
+                with self._lock:
+                    self._retried += 1
+                time.sleep(min(2 ** attempt, 30))
+
+    def _archive(self, job: ArchiveJob) -> None:
+        # A retry after a successful copy only has the move left to do
+        if os.path.exists(job.src):
+            self._copy(job.src, job.copy_dest)
+            logging.info(f"CSV copied to {job.copy_dest}")
+            _move(job.src, job.done_dest)
+        elif not os.path.exists(job.done_dest):
+            raise FileNotFoundError(f"{job.src} disappeared before it was archived")
+
+    def _copy(self, src: str, dest: str) -> None:
+        dest_dir = os.path.dirname(dest)
+        os.makedirs(dest_dir, exist_ok=True)
+
+        if self.compress:
+            tmp = dest + ".gz.part"
+            with open(src, "rb") as f_in, gzip.open(tmp, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            os.replace(tmp, dest + ".gz")
+            return
+
+        if _same_filesystem(src, dest_dir):
+            try:
+                if os.path.exists(dest):
+                    os.remove(dest)
+                os.link(src, dest)
+                return
+            except OSError:
+                pass  # filesystem without hard links
+        shutil.copy2(src, dest)
+
+
+def _move(src: str, dest: str) -> None:
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    if _same_filesystem(src, os.path.dirname(dest)):
+        os.replace(src, dest)
+    else:
+        shutil.move(src, dest)
+
+
+def _same_filesystem(path: str, dest_dir: str) -> bool:
+    try:
+        return os.stat(path).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
@@ -0,0 +1,68 @@
+import time
+import logging
+from threading import Lock
+from sqlalchemy import text
+from app.appsettings.config import settings
+
+
+class TableColumns:
+    """Column names, types and single-column index info of one table."""
+
+    def __init__(self, table_name: str, columns: list[tuple[str, str]], index_rows: list):
+        self.table_name = table_name
+        self.names = [name for name, _ in columns]
+        self.name_set = frozenset(self.names)
+        self.types = {name: col_type for name, col_type in columns}
+        # column -> {"btree": index name, "fulltext": index name}, for indexes led by the column
+        self.indexes: dict[str, dict[str, str]] = {}
+        for row in index_rows:
+            if row["Seq_in_index"] != 1:
+                continue
+            kind = "fulltext" if row["Index_type"] == "FULLTEXT" else "btree"
+            self.indexes.setdefault(row["Column_name"], {}).setdefault(kind, row["Key_name"])
+        self.loaded_at = time.monotonic()
+
+    def describe(self) -> list[dict]:
+        return [
+            {"name": name, "type": self.types[name], "indexes": self.indexes.get(name, {})}
+            for name in self.names
+        ]
+
+
+class ColumnCatalog:
+    """Process-wide cache of TableColumns, like SchemaCache but without reflection.
+
+    One SHOW COLUMNS + SHOW INDEX per table per `ttl` seconds; the table
+    routes invalidate entries when tables or indexes change.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, TableColumns] = {}
+        self._lock = Lock()
+
+    def get(self, db, table_name: str) -> TableColumns:
+        """`db` is a Session or Connection; raises if the table does not exist."""
+        with self._lock:
+            entry = self._entries.get(table_name)
+        if entry and time.monotonic() - entry.loaded_at < self.ttl:
+            return entry
+
+        columns = [(c[0], str(c[1]).lower()) for c in db.execute(text(f"SHOW COLUMNS FROM `{table_name}`")).fetchall()]
+        index_rows = db.execute(text(f"SHOW INDEX FROM `{table_name}`")).mappings().all()
+        entry = TableColumns(table_name, columns, index_rows)
+        with self._lock:
+            self._entries[table_name] = entry
+        logging.debug(f"Cached column catalog for `{table_name}`")
+        return entry
+
+    def invalidate(self, table_name: str | None = None) -> None:
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(table_name, None)
+
+
+# same refresh interval as the ingestion schema cache
+column_catalog = ColumnCatalog(settings.SCHEMA_CACHE_TTL)
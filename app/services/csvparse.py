@@ -0,0 +1,104 @@
+import csv
+from typing import Iterator
+from app.appsettings.config import settings
+from app.services.encodings import DECODE_ERRORS
+
+
+class HeaderProjection:
+    """CSV header resolved once per file to (db column, csv index) pairs."""
+
+    def __init__(self, header: list[str], col_map: dict[str, str], exclude: tuple[str, ...] = ()):
+        projection = {}
+        for idx, name in enumerate(header):
+            norm_key = name.strip().lower().replace(" ", "_")
+            if norm_key in col_map and col_map[norm_key] not in exclude:
+                projection[col_map[norm_key]] = idx  # last duplicate header wins
+
+        self.columns = list(projection)
+        self.indexes = list(projection.values())
+        self.width = len(header)
+
+
+def read_header(file_path: str, encoding: str) -> list[str]:
+    with open(file_path, mode="r", newline="", encoding=encoding, errors=DECODE_ERRORS) as csvfile:
+        return next(csv.reader(csvfile), [])
+
+
+class CsvReaderParser:
+    """stdlib csv.reader; short rows are padded with None, blank lines skipped."""
+
+    name = "csv"
+
+    def batches(self, file_path: str, encoding: str, projection: HeaderProjection, batch_size: int) -> Iterator[list[tuple]]:
+        indexes = projection.indexes
+        with open(file_path, mode="r", newline="", encoding=encoding, errors=DECODE_ERRORS) as csvfile:
+            reader = csv.reader(csvfile)
+            next(reader, None)
+
+            batch = []
+            for raw in reader:
+                if not raw:
+                    continue
+                width = len(raw)
+                batch.append(tuple(raw[i] if i < width else None for i in indexes))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+
+
+class PandasParser:
+    """pandas C engine in chunked mode, reading only the projected columns as strings.
+
+    The row width comes from the header, not the first data row. Fields
+    missing from short rows come back as None like in the csv engine; the C
+    tokenizer hands them over as "", indistinguishable from an empty field,
+    so empty fields are None here too.
+    """
+
+    name = "pandas"
+
+    def batches(self, file_path: str, encoding: str, projection: HeaderProjection, batch_size: int) -> Iterator[list[tuple]]:
+        import pandas as pd
+
+        indexes = projection.indexes
+        if not indexes:
+            # nothing maps to the table; still one row per record for the system columns
+            yield from CsvReaderParser().batches(file_path, encoding, projection, batch_size)
+            return
+
+        reader = pd.read_csv(
+            file_path,
+            engine="c",
+            header=None,
+            skiprows=1,
+            names=range(projection.width),
+            usecols=sorted(set(indexes)),
+            dtype=str,
+            keep_default_na=False,
+            encoding=encoding,
+            encoding_errors=DECODE_ERRORS,
+            chunksize=batch_size,
+        )
+        with reader:
+            for chunk in reader:
+                if chunk.empty:
+                    continue  # header-only file
+                chunk = chunk[indexes].astype(object)
+                chunk = chunk.where(chunk.notna() & (chunk != ""), None)
+                yield list(chunk.itertuples(index=False, name=None))
+
+
+PARSERS = {
+    CsvReaderParser.name: CsvReaderParser(),
+    PandasParser.name: PandasParser(),
+}
+
+
+def get_parser(table_name: str):
+    name = settings.CSV_TABLE_PARSERS.get(table_name) or settings.CSV_PARSER
+    parser = PARSERS.get(name)
+    if parser is None:
+        raise ValueError(f"Unknown CSV parser '{name}'")
+    return parser
@@ -1,148 +1,293 @@
+import math
+import time
+import logging
+from concurrent.futures import wait
 from sqlalchemy.orm import Session
 from app.database.models.users import User
-from sqlalchemy import text
-from datetime import datetime
+from app.database.models.scanrollup import ScanRollup
+from app.appsettings.config import settings
+from app.services.tableregistry import table_registry
+from app.services.executors import get_executor
+from sqlalchemy import and_, case, func, select, text
+from datetime import date, datetime, timedelta
 from collections import defaultdict
 
 
-EXCLUDED_TABLES = {"folders", "processed_files", "users", "revokedtokens"}
-
 def get_total_users(db: Session) -> int:
     return db.query(User).count()
 
 def get_active_users(db: Session) -> int:
     return db.query(User).filter(User.is_active == True).count()
 
-def get_total_data_rows(db: Session) -> int:
-    tables_query = text("""
-        SELECT table_name FROM information_schema.tables
-        WHERE table_schema = DATABASE()
-    """)
+def _day_bounds(day: date) -> tuple[datetime, datetime]:
+    """Half-open [day 00:00, next day 00:00) so CreatedAt indexes can be used."""
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
 
-    result = db.execute(tables_query).fetchall()
-    all_tables = [row[0] for row in result]
 
-    target_tables = [t for t in all_tables if t not in EXCLUDED_TABLES]
+def created_at_conditions(start_date: str | None, end_date: str | None) -> tuple[list[str], dict]:
+    """Inclusive 'YYYY-MM-DD' dates as half-open CreatedAt conditions."""
+    conditions = []
+    params = {}
+    if start_date:
+        conditions.append("CreatedAt >= :range_start")
+        params["range_start"] = _day_bounds(date.fromisoformat(start_date))[0]
+    if end_date:
+        conditions.append("CreatedAt < :range_end")
+        params["range_end"] = _day_bounds(date.fromisoformat(end_date))[1]
+    return conditions, params
 
-    total_count = 0
 
-    for table in target_tables:
-        try:
-            count_query = text(f"SELECT COUNT(*) FROM `{table}`")
-            count_result = db.execute(count_query).fetchone()
-            table_rows = count_result[0] if count_result else 0
-            total_count += table_rows
-        except Exception as e:
-            print(f"Skipping table {table} due to error: {e}")
+def _created_at_range(start_date: str | None, end_date: str | None) -> tuple[str, dict]:
+    """WHERE clause for inclusive 'YYYY-MM-DD' dates as a half-open CreatedAt range."""
+    conditions, params = created_at_conditions(start_date, end_date)
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where_clause, params
+
+
+# MySQL error raised when MAX_EXECUTION_TIME is exceeded
+QUERY_TIMEOUT_ERROR = 3024
+
+def _timeout_hint() -> str:
+    # optimizer hint, ignored as a comment by other databases
+    return f"/*+ MAX_EXECUTION_TIME({settings.DASHBOARD_QUERY_TIMEOUT_MS}) */ "
 
-    return total_count
 
+def _skip_reason(e: Exception) -> str:
+    orig = getattr(e, "orig", e)
+    if orig.args and orig.args[0] == QUERY_TIMEOUT_ERROR:
+        return "timeout"
+    return f"error: {orig}"
 
-def get_todays_data_rows(db: Session) -> int:
-    today_date = datetime.now().date().isoformat()  # Format: 'YYYY-MM-DD'
 
-    # Get all user tables from the database
-    tables_query = text("""
-        SELECT table_name FROM information_schema.tables
-        WHERE table_schema = DATABASE()
-    """)
-    
-    result = db.execute(tables_query).fetchall()
-    all_tables = [row[0] for row in result]
+def _skip(skipped: list | None, table: str, reason: str) -> None:
+    logging.warning(f"Skipping table {table}: {reason}")
+    if skipped is not None:
+        skipped.append({"table": table, "reason": reason})
 
-    target_tables = [t for t in all_tables if t not in EXCLUDED_TABLES]
 
-    total_count = 0
+def _query_table(bind, table: str, select_list: str, tail: str, params: dict) -> list[tuple]:
+    sql = f"SELECT {_timeout_hint()}{select_list} FROM `{table}` {tail}"
+    with bind.connect() as conn:
+        return [tuple(row) for row in conn.execute(text(sql), params)]
+
+
+def _query_union(bind, tables: list[str], select_list: str, tail: str, params: dict) -> dict[str, list[tuple]]:
+    parts = []
+    tags = {}
+    for i, table in enumerate(tables):
+        # the hint applies to the whole statement and must follow the first SELECT
+        hint = _timeout_hint() if i == 0 else ""
+        parts.append(f"SELECT {hint}:src_{i} AS src, {select_list} FROM `{table}` {tail}")
+        tags[f"src_{i}"] = table
+    with bind.connect() as conn:
+        rows = conn.execute(text(" UNION ALL ".join(parts)), {**params, **tags}).fetchall()
+
+    results = {table: [] for table in tables}
+    for row in rows:
+        results[row[0]].append(tuple(row[1:]))
+    return results
+
+
+def fan_out(
+    db: Session,
+    select_list: str,
+    tail: str = "",
+    params: dict | None = None,
+    skipped: list | None = None,
+) -> dict[str, list[tuple]]:
+    """Run `SELECT <select_list> FROM <table> <tail>` against every data table.
 
-    for table in target_tables:
+    Few tables are merged into one UNION ALL statement; otherwise (or when the
+    union fails) each table is queried on its own pooled connection. Tables that
+    fail or time out are left out of the result and appended to `skipped`.
+    """
+    params = params or {}
+    tables = table_registry.tables(db.get_bind())
+    if not tables:
+        return {}
+    bind = db.get_bind()
+
+    if len(tables) <= settings.DASHBOARD_UNION_MAX_TABLES:
+        try:
+            return _query_union(bind, tables, select_list, tail, params)
+        except Exception as e:
+            # one bad table fails the whole statement; find it by querying separately
+            logging.info(f"UNION ALL over {len(tables)} tables failed ({_skip_reason(e)}); querying tables separately")
+
+    executor = get_executor("dashboard", settings.DASHBOARD_WORKERS)
+    futures = {executor.submit(_query_table, bind, t, select_list, tail, params): t for t in tables}
+    # The server enforces the per-query limit; this only guards against a hung
+    # connection, allowing for tables that wait for a free worker.
+    rounds = math.ceil(len(tables) / settings.DASHBOARD_WORKERS)
+    done, not_done = wait(futures, timeout=rounds * settings.DASHBOARD_QUERY_TIMEOUT_MS / 1000 + 1)
+
+    results = {}
+    for future in not_done:
+        future.cancel()
+        _skip(skipped, futures[future], "timeout")
+    for future in done:
+        table = futures[future]
         try:
-            # Assume every user table has a 'CreatedAt' column
-            count_query = text(f"""
-                SELECT COUNT(*) FROM `{table}`
-                WHERE DATE(`CreatedAt`) = :today_date
-            """)
-            count_result = db.execute(count_query, {"today_date": today_date}).fetchone()
-            table_rows = count_result[0] if count_result else 0
-            total_count += int(table_rows)
+            results[table] = future.result()
         except Exception as e:
-            # Skip tables where 'CreatedAt' column is missing
-            print(f"Skipping table {table} due to error: {e}")
+            _skip(skipped, table, _skip_reason(e))
+    return results
+
+
+def _use_rollups() -> bool:
+    return settings.DASHBOARD_SOURCE == "rollup"
+
+
+def _rollup_total(db: Session, *conditions) -> int:
+    total = db.execute(select(func.sum(ScanRollup.row_count)).where(*conditions)).scalar()
+    return int(total or 0)
+
+
+def _rollup_per_scanner(db: Session, *conditions) -> dict:
+    rows = db.execute(
+        select(ScanRollup.scanner_id, func.sum(ScanRollup.row_count))
+        .where(*conditions)
+        .group_by(ScanRollup.scanner_id)
+    ).all()
+    return {scanner_id: int(cnt) for scanner_id, cnt in rows}
+
+
+def get_total_data_rows(db: Session, skipped: list | None = None) -> int:
+    if _use_rollups():
+        return _rollup_total(db)
+
+    results = fan_out(db, "COUNT(*)", skipped=skipped)
+    return sum(int(rows[0][0]) for rows in results.values() if rows)
+
+
+def get_todays_data_rows(db: Session, skipped: list | None = None) -> int:
+    if _use_rollups():
+        return _rollup_total(db, ScanRollup.day == func.current_date())
+
+    day_start, day_end = _day_bounds(datetime.now().date())
+    # tables without a CreatedAt column end up in `skipped`
+    results = fan_out(
+        db,
+        "COUNT(*)",
+        "WHERE `CreatedAt` >= :day_start AND `CreatedAt` < :day_end",
+        {"day_start": day_start, "day_end": day_end},
+        skipped,
+    )
+    return sum(int(rows[0][0]) for rows in results.values() if rows)
+
+
+def _sum_per_scanner(results: dict[str, list[tuple]]) -> dict:
+    scanner_counts = defaultdict(int)
+    for rows in results.values():
+        for scanner_id, cnt in rows:
+            scanner_counts[scanner_id] += int(cnt)
+    return dict(scanner_counts)
 
-    return total_count
 
 def get_total_rows_per_scanner(
     db: Session,
     start_date: str | None = None,
-    end_date: str | None = None
+    end_date: str | None = None,
+    skipped: list | None = None,
 ) -> dict:
-    tables_query = text("""
-        SELECT table_name FROM information_schema.tables
-        WHERE table_schema = DATABASE()
-    """)
+    if _use_rollups():
+        conditions = []
+        if start_date:
+            conditions.append(ScanRollup.day >= start_date)
+        if end_date:
+            conditions.append(ScanRollup.day <= end_date)
+        return _rollup_per_scanner(db, *conditions)
 
-    result = db.execute(tables_query).fetchall()
-    all_tables = [row[0] for row in result]
-    target_tables = [t for t in all_tables if t not in EXCLUDED_TABLES]
+    where_clause, params = _created_at_range(start_date, end_date)
+    results = fan_out(db, "ScannerID, COUNT(*) AS cnt", f"{where_clause} GROUP BY ScannerID", params, skipped)
+    return _sum_per_scanner(results)
 
-    scanner_counts = defaultdict(int)
 
-    for table in target_tables:
-        try:
-            where_clause = ""
-            params = {}
-
-            if start_date and end_date:
-                where_clause = "WHERE DATE(CreatedAt) BETWEEN :start_date AND :end_date"
-                params = {"start_date": start_date, "end_date": end_date}
-            elif start_date:
-                where_clause = "WHERE DATE(CreatedAt) >= :start_date"
-                params = {"start_date": start_date}
-            elif end_date:
-                where_clause = "WHERE DATE(CreatedAt) <= :end_date"
-                params = {"end_date": end_date}
-
-            count_query = text(f"""
-                SELECT ScannerID, COUNT(*) as cnt FROM `{table}`
-                {where_clause}
-                GROUP BY ScannerID
-            """)
-
-            rows = db.execute(count_query, params).fetchall()
-            for row in rows:
-                scanner_id, cnt = row
-                scanner_counts[scanner_id] += int(cnt)
+def get_todays_rows_per_scanner(db: Session, skipped: list | None = None) -> dict:
+    if _use_rollups():
+        return _rollup_per_scanner(db, ScanRollup.day == func.current_date())
 
-        except Exception as e:
-            print(f" Skipping table {table} due to error: {e}")
+    day_start, day_end = _day_bounds(datetime.now().date())
+    results = fan_out(
+        db,
+        "ScannerID, COUNT(*) AS cnt",
+        "WHERE CreatedAt >= :day_start AND CreatedAt < :day_end GROUP BY ScannerID",
+        {"day_start": day_start, "day_end": day_end},
+        skipped,
+    )
+    return _sum_per_scanner(results)
 
-    return dict(scanner_counts)
 
-def get_todays_rows_per_scanner(db: Session) -> dict:
-    today_date = datetime.now().date().isoformat()
+def _summary_from_rollups(db: Session, start_date: str | None, end_date: str | None) -> dict[str, list[int]]:
+    in_range = [ScanRollup.day >= start_date] if start_date else []
+    if end_date:
+        in_range.append(ScanRollup.day <= end_date)
+    rows = db.execute(
+        select(
+            ScanRollup.scanner_id,
+            func.sum(ScanRollup.row_count),
+            func.sum(case((ScanRollup.day == func.current_date(), ScanRollup.row_count), else_=0)),
+            func.sum(case((and_(*in_range), ScanRollup.row_count), else_=0)) if in_range else func.sum(ScanRollup.row_count),
+        ).group_by(ScanRollup.scanner_id)
+    ).all()
+    return {"rollup": [tuple(row) for row in rows]}
 
-    tables_query = text("""
-        SELECT table_name FROM information_schema.tables
-        WHERE table_schema = DATABASE()
-    """)
-    
-    result = db.execute(tables_query).fetchall()
-    all_tables = [row[0] for row in result]
-    target_tables = [t for t in all_tables if t not in EXCLUDED_TABLES]
 
-    scanner_counts = defaultdict(int)
+def _summary_from_tables(db: Session, start_date: str | None, end_date: str | None, skipped: list) -> dict[str, list[tuple]]:
+    day_start, day_end = _day_bounds(datetime.now().date())
+    range_conditions, params = created_at_conditions(start_date, end_date)
+    in_range = " AND ".join(range_conditions) or "1 = 1"
+    # one grouped pass per table instead of one query per tile
+    return fan_out(
+        db,
+        f"""ScannerID, COUNT(*),
+            SUM(CASE WHEN CreatedAt >= :day_start AND CreatedAt < :day_end THEN 1 ELSE 0 END),
+            SUM(CASE WHEN {in_range} THEN 1 ELSE 0 END)""",
+        "GROUP BY ScannerID",
+        {**params, "day_start": day_start, "day_end": day_end},
+        skipped,
+    )
 
-    for table in target_tables:
-        try:
-            count_query = text(f"""
-                SELECT ScannerID, COUNT(*) as cnt FROM `{table}`
-                WHERE DATE(CreatedAt) = :today_date
-                GROUP BY ScannerID
-            """)
-            rows = db.execute(count_query, {"today_date": today_date}).fetchall()
-            for row in rows:
-                scanner_id, cnt = row
-                scanner_counts[scanner_id] += int(cnt)
-        except Exception as e:
-            print(f" Skipping table {table} due to error: {e}")
 
-    return dict(scanner_counts)
+def get_summary(db: Session, start_date: str | None = None, end_date: str | None = None) -> dict:
+    """All dashboard tiles at once; `timings_ms` has the time spent per section."""
+    timings = {}
+
+    started = time.perf_counter()
+    total_users = get_total_users(db)
+    active_users = get_active_users(db)
+    timings["users"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    skipped = []
+    if _use_rollups():
+        results = _summary_from_rollups(db, start_date, end_date)
+    else:
+        results = _summary_from_tables(db, start_date, end_date, skipped)
+    timings["data"] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    total_rows = todays_rows = 0
+    per_scanner = defaultdict(int)
+    todays_per_scanner = defaultdict(int)
+    for rows in results.values():
+        for scanner_id, total, today, in_range in rows:
+            total_rows += int(total or 0)
+            todays_rows += int(today or 0)
+            if in_range:
+                per_scanner[scanner_id] += int(in_range)
+            if today:
+                todays_per_scanner[scanner_id] += int(today)
+    timings["aggregate"] = round((time.perf_counter() - started) * 1000, 1)
+
+    return {
+        "total_users": total_users,
+        "active_users": active_users,
+        "total_data_rows": total_rows,
+        "todays_data_rows": todays_rows,
+        "total_rows_per_scanner": dict(per_scanner),
+        "todays_data_per_scanner": dict(todays_per_scanner),
+        "skipped_tables": skipped,
+        "timings_ms": timings,
+    }
@@ -0,0 +1,130 @@
+import time
+from threading import Event, Lock
+from typing import Any, Callable, Hashable, Iterable
+from app.appsettings.config import settings
+
+
+class _Entry:
+    def __init__(self, value: Any, versions: dict[str, int] | None, generation: int, epoch: int):
+        self.value = value
+        self.versions = versions
+        self.generation = generation
+        self.epoch = epoch
+        self.stored_at = time.monotonic()
+
+
+class _Flight:
+    """One in-progress computation that concurrent identical requests wait on."""
+
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+        self.error: Exception | None = None
+
+
+class DashboardCache:
+    """In-process cache of dashboard responses with single-flight misses.
+
+    Entries expire after `ttl` seconds and are dropped as soon as the watcher
+    commits a file into a table they were computed from. `tables=None` means
+    the response spans every data table, so any ingest invalidates it; an
+    empty tuple means it does not depend on ingested data at all.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[Hashable, _Entry] = {}
+        self._flights: dict[Hashable, _Flight] = {}
+        self._versions: dict[str, int] = {}
+        self._generation = 0  # bumped by every invalidation
+        self._epoch = 0  # bumped by full invalidations
+        self._lock = Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._invalidations = 0
+
+    def get(self, key: Hashable, compute: Callable[[], Any], tables: Iterable[str] | None = None,
+            coalesce: bool = True) -> Any:
+        """`coalesce=False` never waits on a computation started earlier, which may
+        predate the latest ingest; used for snapshots that must be current."""
+        if self.ttl <= 0:
+            return compute()
+        tables = None if tables is None else tuple(tables)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._fresh(entry):
+                self._hits += 1
+                return entry.value
+
+            flight = self._flights.get(key) if coalesce else None
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                if coalesce:
+                    self._flights[key] = flight
+                self._misses += 1
+            else:
+                self._coalesced += 1
+            # snapshot before computing so an ingest that lands meanwhile makes the result stale
+            versions = {t: self._versions.get(t, 0) for t in tables} if tables is not None else None
+            generation, epoch = self._generation, self._epoch
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            with self._lock:
+                self._entries[key] = _Entry(flight.value, versions, generation, epoch)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, table_name: str | None = None) -> None:
+        """Call after data in `table_name` changed (None: everything)."""
+        with self._lock:
+            self._invalidations += 1
+            self._generation += 1
+            if table_name is None:
+                self._epoch += 1
+                self._entries.clear()
+            else:
+                self._versions[table_name] = self._versions.get(table_name, 0) + 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses + self._coalesced
+            return {
+                "ttl_seconds": self.ttl,
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                # requests that waited for an identical in-flight computation
+                "coalesced": self._coalesced,
+                "invalidations": self._invalidations,
+                "hit_ratio": round((self._hits + self._coalesced) / lookups, 3) if lookups else 0.0,
+            }
+
+    def _fresh(self, entry: _Entry) -> bool:
+        if time.monotonic() - entry.stored_at >= self.ttl:
+            return False
+        if entry.epoch != self._epoch:
+            return False
+        if entry.versions is None:
+            return entry.generation == self._generation
+        return all(self._versions.get(t, 0) == v for t, v in entry.versions.items())
+
+
+dashboard_cache = DashboardCache(settings.DASHBOARD_CACHE_TTL)
@@ -0,0 +1,175 @@
+import codecs
+import logging
+import threading
+from collections import Counter
+import chardet
+
+SAMPLE_SIZE = 64 * 1024
+# read size when verifying a whole file or feeding chardet past the sample
+VERIFY_CHUNK = 1024 * 1024
+LEARN_FILES = 5
+
+# (BOM, codec) - UTF-32 before UTF-16 because BOM_UTF32_LE starts with BOM_UTF16_LE
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# Error handler used when reading CSVs: replaces undecodable bytes with U+FFFD
+# (instead of silently dropping them) and counts them per thread.
+DECODE_ERRORS = "ingest-count-replace"
+_local = threading.local()
+
+
+def _count_replace(exc: UnicodeDecodeError):
+    _local.errors = getattr(_local, "errors", 0) + (exc.end - exc.start)
+    return "\ufffd", exc.end
+
+
+codecs.register_error(DECODE_ERRORS, _count_replace)
+
+
+def reset_decode_errors() -> None:
+    _local.errors = 0
+
+
+def decode_errors() -> int:
+    """Bytes replaced on this thread since the last reset."""
+    return getattr(_local, "errors", 0)
+
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+def record_decode_errors(count: int) -> None:
+    if count:
+        _count("files_with_decode_errors")
+        _count("decode_error_bytes", count)
+
+
+def stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+class EncodingProfile:
+    """Encoding knowledge for one folder/scanner, for files that are not UTF-8.
+
+    Order per file: BOM, the learned encoding when the sample is plain ASCII
+    (an ASCII head says nothing about the rest), strict UTF-8 on the sample,
+    strict decode with the learned encoding, and chardet only when all of
+    those fail. Only files that failed the UTF-8 check vote: after
+    LEARN_FILES of them the winner becomes `encoding`, which the caller
+    persists in the folders row. A learned encoding is checked against the
+    whole file, since rows are committed while parsing; UTF-8 picks are not,
+    and bytes that still fail are counted and logged by the ingest.
+    """
+
+    def __init__(self, encoding: str | None = None):
+        # UTF-8 needs no profile (fast path); profiles saved by older versions may say so
+        self.encoding = None if encoding and _is_utf8(encoding) else encoding
+        self._votes = Counter()
+        self._lock = threading.Lock()
+
+    def detect(self, file_path: str) -> str:
+        with open(file_path, "rb") as f:
+            sample = f.read(SAMPLE_SIZE)
+
+        for bom, codec in BOMS:
+            if sample.startswith(bom):
+                _count("bom")
+                return codec
+
+        if self.encoding and sample.isascii() and _fits(file_path, sample, self.encoding):
+            _count("profile_hit")
+            return self.encoding
+
+        if _decodes(sample, "utf-8"):
+            _count("utf8_fast_path")
+            return "utf-8"
+
+        if self.encoding and _fits(file_path, sample, self.encoding):
+            _count("profile_hit")
+            return self.encoding
+
+        _count("detected")
+        detected = _detect(file_path, sample)
+        if self.encoding:
+            logging.warning(f"{file_path} does not decode as profile encoding {self.encoding}; detected {detected}")
+        return self._learn(detected)
+
+    def _learn(self, encoding: str) -> str:
+        with self._lock:
+            if self.encoding is None and not _is_utf8(encoding):
+                self._votes[encoding] += 1
+                if sum(self._votes.values()) >= LEARN_FILES:
+                    self.encoding = self._votes.most_common(1)[0][0]
+                    logging.info(f"Learned encoding profile {self.encoding} from {dict(self._votes)}")
+        return encoding
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    try:
+        # incremental so a multi-byte character cut off at the sample end is not an error
+        codecs.getincrementaldecoder(encoding)("strict").decode(sample, final=False)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
+
+
+def _is_utf8(encoding: str) -> bool:
+    try:
+        return codecs.lookup(encoding).name in ("utf-8", "ascii")
+    except LookupError:
+        return False
+
+
+def _fits(file_path: str, sample: bytes, encoding: str) -> bool:
+    """Strict decode of the sample, then of the whole file if it is longer."""
+    if not _decodes(sample, encoding):
+        return False
+    if len(sample) < SAMPLE_SIZE:
+        return True
+    decoder = codecs.getincrementaldecoder(encoding)("strict")
+    try:
+        with open(file_path, "rb") as f:
+            while chunk := f.read(VERIFY_CHUNK):
+                decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+        return True
+    except UnicodeDecodeError as e:
+        _count("sample_mismatch")
+        logging.warning(f"{file_path} passed the {encoding} check on its first {SAMPLE_SIZE} bytes but not in full: {e}")
+        return False
+
+
+def _detect(file_path: str, sample: bytes) -> str:
+    """chardet over the whole file, stopping as soon as it is confident."""
+    if len(sample) < SAMPLE_SIZE:
+        return chardet.detect(sample)["encoding"] or "utf-8"
+    detector = chardet.UniversalDetector()
+    with open(file_path, "rb") as f:
+        while not detector.done and (chunk := f.read(VERIFY_CHUNK)):
+            detector.feed(chunk)
+    return detector.close()["encoding"] or "utf-8"
+
+
+_profiles: dict[int, EncodingProfile] = {}
+_profiles_lock = threading.Lock()
+
+
+def get_profile(folder_id: int, encoding: str | None = None) -> EncodingProfile:
+    with _profiles_lock:
+        profile = _profiles.get(folder_id)
+        if profile is None:
+            profile = _profiles[folder_id] = EncodingProfile(encoding)
+        return profile
@@ -0,0 +1,110 @@
+import asyncio
+import itertools
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from threading import RLock
+from typing import Any, Callable, Iterator
+
+
+class IngestEvent:
+    """One committed chunk of a CSV in a data table."""
+
+    def __init__(self, seq: int, table: str, scanner_id: str, rows: int, file: str):
+        self.seq = seq
+        self.table = table
+        self.scanner_id = scanner_id
+        self.rows = rows
+        self.file = file
+        self.timestamp = datetime.now()
+
+    def to_dict(self) -> dict:
+        return {
+            "seq": self.seq,
+            "table": self.table,
+            "scanner_id": self.scanner_id,
+            "rows": self.rows,
+            "file": self.file,
+            "timestamp": self.timestamp.isoformat(timespec="seconds"),
+        }
+
+
+class Subscription:
+    """Bounded per-client queue living on the client's event loop.
+
+    A client that falls `max_queued` events behind is marked `lagged` instead
+    of blocking the publisher; it should then take a fresh snapshot.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queued: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.lagged = False
+
+    def _put(self, event: IngestEvent) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.lagged = True
+
+
+class EventBus:
+    """Fan-out of ingest events from watcher threads to async subscribers.
+
+    Ingest commits and publishes inside `publishing()`, and `snapshot()`
+    runs under the same lock, so a snapshot's seq covers exactly the rows
+    it counted.
+    """
+
+    def __init__(self, max_queued: int = 1000):
+        self.max_queued = max_queued
+        self._subscribers: set[Subscription] = set()
+        self._seq = itertools.count(1)
+        self._last_seq = 0
+        self._lock = RLock()
+
+    @property
+    def last_seq(self) -> int:
+        with self._lock:
+            return self._last_seq
+
+    @contextmanager
+    def publishing(self) -> Iterator[None]:
+        """Hold around committing the rows an event describes and publishing it."""
+        with self._lock:
+            yield
+
+    def snapshot(self, compute: Callable[[], Any]) -> tuple[int, Any]:
+        """(last seq, compute()) with no commit/publish in between."""
+        with self._lock:
+            return self._last_seq, compute()
+
+    def subscribe(self) -> Subscription:
+        sub = Subscription(asyncio.get_running_loop(), self.max_queued)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, table: str, scanner_id: str, rows: int, file: str) -> IngestEvent:
+        with self._lock:
+            event = IngestEvent(next(self._seq), table, scanner_id, rows, file)
+            self._last_seq = event.seq
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, event)
+            except RuntimeError:
+                # loop already closed; the socket handler cleans up on its way out
+                logging.debug("Dropping ingest event for a closed subscriber loop")
+        return event
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+
+ingest_events = EventBus()
@@ -0,0 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_lock = Lock()
+
+
+def get_executor(name: str, workers: int) -> ThreadPoolExecutor:
+    """Process-wide thread pool `name`, created on first use with `workers` threads."""
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        return executor
@@ -0,0 +1,184 @@
+import io
+import csv
+import json
+import zlib
+from datetime import date, datetime
+from typing import Iterator
+from sqlalchemy import text
+from app.services.columncatalog import column_catalog
+from app.services.dashboard import created_at_conditions
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+# rows per yielded HTTP chunk / parquet row group
+EXPORT_CHUNK_ROWS = 5000
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class ExportQuery:
+    def __init__(self, table_name: str, scanner_id: str | None, start_date: str | None, end_date: str | None):
+        conditions, params = created_at_conditions(start_date, end_date)
+        if scanner_id:
+            conditions.append("ScannerID = :scanner_id")
+            params["scanner_id"] = scanner_id
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        self.table_name = table_name
+        self.sql = text(f"SELECT * FROM `{table_name}` {where_clause}")
+        self.params = params
+
+
+def _stream_rows(bind, query: ExportQuery) -> Iterator[tuple[list[str], list[tuple]]]:
+    """(column names, chunk of rows) read through an unbuffered server-side cursor.
+
+    With PyMySQL, stream_results uses SSCursor, so only the current chunk is
+    held in memory. If the client goes away mid-export the connection is
+    discarded instead of draining the remaining rows.
+    """
+    conn = bind.connect()
+    finished = False
+    try:
+        result = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_CHUNK_ROWS).execute(
+            query.sql, query.params
+        )
+        columns = list(result.keys())
+        empty = True
+        for chunk in result.partitions(EXPORT_CHUNK_ROWS):
+            empty = False
+            yield columns, chunk
+        if empty:
+            # lets writers emit a header / schema for an empty export
+            yield columns, []
+        finished = True
+    finally:
+        if not finished:
+            conn.invalidate()
+        conn.close()
+
+
+def _csv_chunks(bind, query: ExportQuery) -> Iterator[bytes]:
+    header_sent = False
+    for columns, rows in _stream_rows(bind, query):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_sent:
+            writer.writerow(columns)
+            header_sent = True
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl_chunks(bind, query: ExportQuery) -> Iterator[bytes]:
+    for columns, rows in _stream_rows(bind, query):
+        if not rows:
+            continue
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+        ).encode("utf-8")
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_type(pa, mysql_type: str):
+    if mysql_type.startswith(("tinyint", "smallint", "mediumint", "int", "bigint")):
+        return pa.int64()
+    if mysql_type.startswith(("datetime", "timestamp")):
+        return pa.timestamp("us")
+    if mysql_type == "date":
+        return pa.date32()
+    return pa.string()
+
+
+def _converter(pa, arrow_type):
+    """Python value -> value accepted by `arrow_type`."""
+    if pa.types.is_integer(arrow_type):
+        return lambda v: v if v is None or isinstance(v, int) else int(v)
+    if pa.types.is_timestamp(arrow_type):
+        # PyMySQL returns invalid dates such as 0000-00-00 as strings
+        return lambda v: v if isinstance(v, datetime) else None
+    if pa.types.is_date(arrow_type):
+        return lambda v: v if isinstance(v, date) else None
+    return lambda v: v if v is None else str(v)
+
+
+def _parquet_chunks(bind, query: ExportQuery) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with bind.connect() as conn:
+        types = column_catalog.get(conn, query.table_name).types
+    sink = ChunkSink()
+    writer = None
+    try:
+        for columns, rows in _stream_rows(bind, query):
+            if writer is None:
+                schema = pa.schema([(c, _arrow_type(pa, types.get(c, ""))) for c in columns])
+                converters = [_converter(pa, field.type) for field in schema]
+                writer = pq.ParquetWriter(sink, schema, compression="snappy")
+            # one row group per chunk
+            arrays = [
+                pa.array([convert(row[i]) for row in rows], type=schema.field(i).type)
+                for i, convert in enumerate(converters)
+            ]
+            if rows:
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.take()
+
+
+def _gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_table(bind, query: ExportQuery, fmt: str, gzip: bool = False) -> Iterator[bytes]:
+    """Byte chunks of the whole export; parquet is compressed internally and never gzipped."""
+    if fmt == "csv":
+        chunks = _csv_chunks(bind, query)
+    elif fmt == "jsonl":
+        chunks = _jsonl_chunks(bind, query)
+    elif fmt == "parquet":
+        return _parquet_chunks(bind, query)
+    else:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    return _gzip(chunks) if gzip else chunks
@@ -1,67 +1,152 @@
 import os
+import logging
 from datetime import datetime
-from glob import glob
+from fnmatch import fnmatch
 from pathlib import Path
+from threading import Thread
+from typing import Callable
 from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from app.database.models.processedFile import ProcessedFile
 from app.database.models.folders import Folder
+from app.database.connection import SessionLocal
+from app.database.upsert import upsert_stmt
 from app.appsettings.config import settings
 
-def add_folder(db: Session, path: str, scanner_id: str, table_name: str) -> Folder:
+SEED_CHUNK = 1000
+
+def add_folder(
+    db: Session,
+    path: str,
+    scanner_id: str,
+    table_name: str,
+    ingest_mode: str | None = None,
+    watch_mode: str | None = None,
+) -> Folder:
     p = str(Path(path).resolve())
     folder = db.execute(select(Folder).where(Folder.path == p)).scalar_one_or_none()
     if folder:
         folder.active = True
         folder.scanner_id = scanner_id
         folder.table_name = table_name
+        folder.ingest_mode = ingest_mode
+        folder.watch_mode = watch_mode
         db.commit()
         db.refresh(folder)
         return folder
 
-    folder = Folder(path=p, active=True, scanner_id=scanner_id, table_name=table_name)
+    folder = Folder(path=p, active=True, scanner_id=scanner_id, table_name=table_name,
+                    ingest_mode=ingest_mode, watch_mode=watch_mode)
     db.add(folder)
     db.commit()
     db.refresh(folder)
-    seed_folder_files(db, folder)
+    # seeding large folders takes a while, so it runs in the background
+    start_seed_job(folder.id, folder.path)
     return folder
 
 
-def seed_folder_files(db: Session, folder: Folder) -> None:
-    pattern = os.path.join(folder.path, settings.FILE_GLOB)
-    for fp in sorted(glob(pattern)):
-        upsert_file_record(db, folder.id, fp)
+def seed_folder_files(db: Session, folder_id: int, folder_path: str, progress: Callable[[int], None] | None = None) -> int:
+    """Record every matching file of a folder in processed_files (processed=False).
 
-def upsert_file_record(db: Session, folder_id: int, full_path: str) -> ProcessedFile:
-    full_path = str(Path(full_path).resolve())
-    filename = Path(full_path).name
-    mtime = datetime.fromtimestamp(Path(full_path).stat().st_mtime)
+    Streams os.scandir, reuses its stat data and writes SEED_CHUNK rows per
+    upsert statement. Existing rows only get their mtime/size refreshed.
+    """
+    stmt = upsert_stmt(
+        ProcessedFile.__table__,
+        db.get_bind().dialect.name,
+        index_elements=["folder_id", "full_path"],
+        set_=lambda new, c: {"mtime": new.mtime, "size": new.size},
+    )
 
-    pf = db.execute(
-        select(ProcessedFile).where(
-            ProcessedFile.folder_id == folder_id,
-            ProcessedFile.full_path == full_path
-        )
-    ).scalar_one_or_none()
+    written = 0
+    chunk = []
+    with os.scandir(folder_path) as it:
+        for entry in it:
+            if not fnmatch(entry.name, settings.FILE_GLOB) or not entry.is_file():
+                continue
+            st = entry.stat()
+            chunk.append({
+                "folder_id": folder_id,
+                "filename": entry.name,
+                "full_path": entry.path,
+                "processed": False,
+                "mtime": datetime.fromtimestamp(st.st_mtime),
+                "size": st.st_size,
+            })
+            if len(chunk) >= SEED_CHUNK:
+                written += _write_chunk(db, stmt, chunk)
+                if progress:
+                    progress(written)
 
-    if pf:
-        # Keep earliest mtime we saw? For ordering we set to actual file mtime
-        pf.mtime = mtime
-        db.commit()
-        db.refresh(pf)
-        return pf
-
-    pf = ProcessedFile(
-        folder_id=folder_id,
-        filename=filename,
-        full_path=full_path,
-        processed=False,
-        mtime=mtime
-    )
-    db.add(pf)
+    if chunk:
+        written += _write_chunk(db, stmt, chunk)
+        if progress:
+            progress(written)
+    return written
+
+
+def _write_chunk(db: Session, stmt, chunk: list[dict]) -> int:
+    db.execute(stmt, chunk)
     db.commit()
-    db.refresh(pf)
-    return pf
+    count = len(chunk)
+    chunk.clear()
+    return count
+
+class SeedJob:
+    """Background seeding of one folder, with progress for /folders/{id}/seed."""
+
+    def __init__(self, folder_id: int, folder_path: str):
+        self.folder_id = folder_id
+        self.folder_path = folder_path
+        self.status = "running"
+        self.files_written = 0
+        self.error: str | None = None
+        self.started_at = datetime.now()
+        self.finished_at: datetime | None = None
+
+    def run(self) -> None:
+        db = SessionLocal()
+        try:
+            seed_folder_files(db, self.folder_id, self.folder_path, progress=self._progress)
+            self.status = "done"
+            logging.info(f"Seeded {self.files_written} files for folder {self.folder_path}")
+        except Exception as e:
+            db.rollback()
+            self.status = "failed"
+            self.error = str(e)
+            logging.error(f"Seeding failed for folder {self.folder_path}: {e}")
+        finally:
+            self.finished_at = datetime.now()
+            db.close()
+
+    def _progress(self, written: int) -> None:
+        self.files_written = written
+
+    def to_dict(self) -> dict:
+        elapsed = ((self.finished_at or datetime.now()) - self.started_at).total_seconds()
+        return {
+            "folder_id": self.folder_id,
+            "status": self.status,
+            "files_written": self.files_written,
+            "files_per_second": round(self.files_written / elapsed, 1) if elapsed else 0.0,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+        }
+
+
+seed_jobs: dict[int, SeedJob] = {}
+
+
+def start_seed_job(folder_id: int, folder_path: str) -> SeedJob:
+    job = seed_jobs.get(folder_id)
+    if job and job.status == "running":
+        return job
+    job = SeedJob(folder_id, folder_path)
+    seed_jobs[folder_id] = job
+    Thread(target=job.run, name=f"seed-folder-{folder_id}", daemon=True).start()
+    return job
+
 
 def list_folders(db: Session):
     return db.execute(select(Folder)).scalars().all()
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import zipfile
+import mimetypes
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from threading import Lock
+from typing import Iterator
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+from app.appsettings.config import settings
+from app.services.export import ChunkSink
+from app.services.executors import get_executor
+
+
+def resolve_image_path(csv_path: str, front_side_image: str) -> str:
+    """Image paths in the CSVs are relative to the parent of the CSV's folder."""
+    base_dir = os.path.dirname(csv_path)
+    parent_dir = os.path.dirname(base_dir)
+
+    img_relative = "/".join(front_side_image.split("/")[-2:])  # Use '/' everywhere
+
+    # Normalize path to avoid issues
+    return os.path.normpath(os.path.join(parent_dir, img_relative))
+
+
+class ImageInfo:
+    """Resolved path plus the stat-derived headers of one image."""
+
+    def __init__(self, path: str, stat_result: os.stat_result):
+        self.path = path
+        self.stat = stat_result
+        self.etag = f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+        self.last_modified = formatdate(stat_result.st_mtime, usegmt=True)
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.cached_at = time.monotonic()
+
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": self.last_modified,
+            "Cache-Control": f"private, max-age={settings.IMAGE_MAX_AGE}",
+        }
+
+    def not_modified(self, if_none_match: str | None, if_modified_since: str | None) -> bool:
+        # If-None-Match wins over If-Modified-Since (RFC 9110)
+        if if_none_match:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.stat.st_mtime) <= since
+        return False
+
+
+class ImageCache:
+    """Bounded LRU of (csv_path, image) -> ImageInfo.
+
+    Saves the path resolution and stat per request; entries are re-checked
+    after `ttl` seconds so replaced files get a new ETag.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple[str, str], ImageInfo] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, csv_path: str, front_side_image: str) -> ImageInfo:
+        """Raises FileNotFoundError when the image does not exist."""
+        key = (csv_path, front_side_image)
+        with self._lock:
+            info = self._entries.get(key)
+            if info and time.monotonic() - info.cached_at < self.ttl:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return info
+            self._misses += 1
+
+        path = resolve_image_path(csv_path, front_side_image)
+        try:
+            st = os.stat(path)
+        except OSError:
+            with self._lock:
+                self._entries.pop(key, None)
+            raise FileNotFoundError(f"Image not found at {path}")
+        return self._store(key, ImageInfo(path, st))
+
+    def restat(self, csv_path: str, front_side_image: str, info: ImageInfo) -> ImageInfo:
+        """`info` re-checked against the file, for building a body; the cached
+        stat may be up to `ttl` seconds old. Raises FileNotFoundError."""
+        try:
+            st = os.stat(info.path)
+        except OSError:
+            with self._lock:
+                self._entries.pop((csv_path, front_side_image), None)
+            raise FileNotFoundError(f"Image not found at {info.path}")
+        if st.st_size == info.stat.st_size and st.st_mtime_ns == info.stat.st_mtime_ns:
+            return info
+        return self._store((csv_path, front_side_image), ImageInfo(info.path, st))
+
+    def _store(self, key: tuple[str, str], info: ImageInfo) -> ImageInfo:
+        with self._lock:
+            self._entries[key] = info
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return info
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self._hits, "misses": self._misses}
+
+
+image_cache = ImageCache(settings.IMAGE_CACHE_SIZE, settings.IMAGE_CACHE_TTL)
+
+
+# bytes read per zip write; each one is handed to the response right away
+ZIP_CHUNK_SIZE = 256 * 1024
+
+
+class BatchItem:
+    """One requested image and, once resolved, its ImageInfo or error."""
+
+    def __init__(self, csv_path: str | None, image: str | None, record_id: int | None = None, column: str | None = None):
+        self.csv_path = csv_path
+        self.image = image
+        self.record_id = record_id
+        self.column = column
+        self.info: ImageInfo | None = None
+        self.status = "pending"
+        self.error: str | None = None
+        self.name: str | None = None
+
+    def manifest(self) -> dict:
+        entry = {"csv_path": self.csv_path, "image": self.image, "status": self.status}
+        if self.record_id is not None:
+            entry.update(record_id=self.record_id, column=self.column)
+        if self.info:
+            entry.update(name=self.name, size=self.info.stat.st_size, content_type=self.info.content_type)
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+def items_for_records(db: Session, table_name: str, ids: list[int], image_columns: list[str]) -> list[BatchItem]:
+    """One item per (record, image column); CsvPath locates the images."""
+    rows = db.execute(
+        text(
+            f"SELECT `id`, `CsvPath`, {', '.join(f'`{c}`' for c in image_columns)} "
+            f"FROM `{table_name}` WHERE `id` IN :ids"
+        ).bindparams(bindparam("ids", expanding=True)),
+        {"ids": ids},
+    ).mappings().all()
+    by_id = {row["id"]: row for row in rows}
+
+    items = []
+    for record_id in ids:
+        row = by_id.get(record_id)
+        for column in image_columns:
+            item = BatchItem(row["CsvPath"] if row else None, row[column] if row else None, record_id, column)
+            if row is None:
+                item.status, item.error = "not_found", "record does not exist"
+            elif not item.csv_path or not item.image:
+                item.status, item.error = "not_found", "no image path in record"
+            items.append(item)
+    return items
+
+
+def _resolve(item: BatchItem) -> None:
+    if item.status != "pending":
+        return
+    try:
+        item.info = image_cache.get(item.csv_path, item.image)
+        item.status = "ok"
+    except FileNotFoundError as e:
+        item.status, item.error = "not_found", str(e)
+    except Exception as e:
+        item.status, item.error = "error", str(e)
+
+
+def resolve_batch(items: list[BatchItem]) -> list[BatchItem]:
+    """Resolve paths and stat all items concurrently; failures stay per item."""
+    list(get_executor("images", settings.IMAGE_BATCH_WORKERS).map(_resolve, items))
+    return items
+
+
+def zip_stream(items: list[BatchItem]) -> Iterator[bytes]:
+    """Stored (uncompressed) zip of the resolved images plus manifest.json.
+
+    The archive is written to a non-seekable sink, so each chunk is yielded
+    as soon as it is written and memory stays at one chunk per response.
+    """
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for index, item in enumerate(items):
+            if item.status != "ok":
+                continue
+            name = f"{index:04d}_{os.path.basename(item.info.path)}"
+            try:
+                src = open(item.info.path, "rb")
+                zinfo = zipfile.ZipInfo.from_file(item.info.path, name)
+            except OSError as e:
+                item.status, item.error, item.info = "error", str(e), None
+                continue
+            item.name = name
+            with src, zf.open(zinfo, "w") as dest:
+                while chunk := src.read(ZIP_CHUNK_SIZE):
+                    dest.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+
+        manifest = {"items": [item.manifest() for item in items]}
+        zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+    yield sink.take()
@@ -1,87 +1,89 @@
 import os
-import csv,shutil
-from sqlalchemy import Table, insert
+import time
 from sqlalchemy.orm import Session
-from app.database.connection import Base, engine
-import chardet,logging
+from app.database.connection import engine
+import logging
 from app.appsettings.config import settings
-
-BATCH_SIZE = 1000  
-
-
-def get_encoding(file_path):
-    with open(file_path, "rb") as f:
-        raw_data = f.read(10000)  # check first 10k bytes
-    result = chardet.detect(raw_data)
-    return result["encoding"]
-
-
-def ingest_csv(file_path: str, db: Session, table_name: str, scanner_id: str):
-    encoding = get_encoding(file_path)
+from app.services.encodings import EncodingProfile, decode_errors, record_decode_errors, reset_decode_errors
+from app.services.csvparse import HeaderProjection, get_parser, read_header
+from app.services.loaders import get_loader
+from app.services.schemacache import schema_cache
+from app.services.rollups import add_rows
+from app.services.dashboardcache import dashboard_cache
+from app.services.events import ingest_events
+
+SYSTEM_COLUMNS = ("ScannerID", "Processed", "CsvPath")
+PARSE_BATCH_SIZE = 5000
+
+
+def resolve_ingest_mode(table_name: str, folder_mode: str | None = None) -> str:
+    """Folder setting wins over the per-table setting, which wins over the global default."""
+    return folder_mode or settings.INGEST_TABLE_MODES.get(table_name) or settings.INGEST_MODE
+
+
+def ingest_csv(
+    file_path: str,
+    db: Session,
+    table_name: str,
+    scanner_id: str,
+    mode: str | None = None,
+    profile: EncodingProfile | None = None,
+):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"CSV file not found: {file_path}")
-
-    # Reflect the given table from DB
-    metadata = Base.metadata
-    metadata.reflect(bind=engine, only=[table_name])
-    if table_name not in metadata.tables:
-        raise ValueError(f"Table '{table_name}' does not exist in the database")
-
-    table: Table = metadata.tables[table_name]
-
-    # Build a mapping of normalized DB columns
-    col_map = {col.lower().replace(" ", "_"): col for col in table.columns.keys()}
-
-    with open(file_path, mode="r", newline="", encoding=encoding, errors="ignore") as csvfile:
-        reader = csv.DictReader(csvfile)
-
-        rows_to_insert = []
-        total_inserted = 0
-
-        for row in reader:
-            mapped_row = {}
-
-            for k, v in row.items():
-                norm_key = k.strip().lower().replace(" ", "_")
-                if norm_key in col_map:
-                    mapped_row[col_map[norm_key]] = v
-
-            # Add system fields
-            mapped_row["ScannerID"] = scanner_id
-            mapped_row["Processed"] = 0
-            mapped_row["CsvPath"] = file_path
-
-            rows_to_insert.append(mapped_row)
-
-            if len(rows_to_insert) >= BATCH_SIZE:
-                db.execute(insert(table), rows_to_insert)
-                db.commit()
-                total_inserted += len(rows_to_insert)
-                rows_to_insert.clear()
-
-        # Insert remaining rows
-        if rows_to_insert:
-            db.execute(insert(table), rows_to_insert)
-            db.commit()
-            total_inserted += len(rows_to_insert)
-
-        logging.info(
-            f"Inserted {total_inserted} rows into table `{table_name}` from {file_path}"
-        )
-    try:
-        filename = os.path.basename(file_path)
-        parent_folder = os.path.basename(os.path.dirname(file_path))  
-
-        relative_part = os.path.join(parent_folder, filename)  
-        
-        dest_path = os.path.join(settings.COPY_FILE_PATH, relative_part)
-        dest_dir = os.path.dirname(dest_path)
-        os.makedirs(dest_dir, exist_ok=True)
-        shutil.copy2(file_path, dest_path)
-
-        logging.info(f"CSV copied to {dest_path}")
-
-    except Exception as e:
-        logging.error(f"Failed to copy CSV: {e}")
-        
+    encoding = (profile or EncodingProfile()).detect(file_path)
+    reset_decode_errors()
+
+    # Reflected table + normalized column map, cached process-wide
+    schema = schema_cache.get(engine, table_name)
+
+    # Normalize the header once and turn it into a (db column, csv index) projection
+    projection = HeaderProjection(read_header(file_path, encoding), schema.col_map, exclude=SYSTEM_COLUMNS)
+
+    # System fields
+    columns = projection.columns + list(SYSTEM_COLUMNS)
+    system_values = (scanner_id, 0, file_path)
+
+    parser = get_parser(table_name)
+    parse_stats = {"rows": 0, "seconds": 0.0}
+
+    def read_rows():
+        batches = parser.batches(file_path, encoding, projection, PARSE_BATCH_SIZE)
+        while True:
+            t0 = time.perf_counter()
+            batch = next(batches, None)
+            parse_stats["seconds"] += time.perf_counter() - t0
+            if batch is None:
+                return
+            parse_stats["rows"] += len(batch)
+            for row in batch:
+                yield row + system_values
+
+    def commit_batch(session: Session, rows: int) -> None:
+        # scan_rollups is updated in the same transaction as each insert
+        add_rows(session, table_name, scanner_id, rows)
+        # commit, cache invalidation and event are one step for dashboard snapshots
+        with ingest_events.publishing():
+            session.commit()
+            dashboard_cache.invalidate(table_name)
+            ingest_events.publish(table_name, scanner_id, rows, file_path)
+
+    loader = get_loader(resolve_ingest_mode(table_name, mode))
+    started = time.perf_counter()
+    total_inserted = loader.load(db, schema, columns, read_rows, commit_batch)
+    elapsed = time.perf_counter() - started
+
+    bad_bytes = decode_errors()
+    record_decode_errors(bad_bytes)
+    if bad_bytes:
+        logging.warning(f"{bad_bytes} bytes of {file_path} could not be decoded as {encoding} and were replaced")
+        if profile and profile.encoding == encoding:
+            logging.warning(f"Encoding profile {encoding} does not fit {file_path}; check the folder's encoding")
+
+    logging.info(
+        f"Inserted {total_inserted} rows into table `{table_name}` from {file_path} "
+        f"via {loader.name} loader in {elapsed:.2f}s ({total_inserted / max(elapsed, 1e-6):.0f} rows/s); "
+        f"{parser.name} parser {parse_stats['seconds']:.2f}s "
+        f"({parse_stats['rows'] / max(parse_stats['seconds'], 1e-6):.0f} rows/s)"
+    )
     return total_inserted
@@ -0,0 +1,162 @@
+import os
+import logging
+import tempfile
+from typing import Callable, Iterable
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app.appsettings.config import settings
+from app.services.schemacache import TableSchema
+
+BATCH_SIZE = 1000
+
+# MySQL errors meaning LOAD DATA LOCAL INFILE is not available on this server/client
+LOCAL_INFILE_ERRORS = {1148, 2068, 3948}
+
+# Callable returning a fresh iterator of row tuples ordered like `columns`
+RowSource = Callable[[], Iterable[tuple]]
+# Commits one loaded chunk given (db, rows); callers use it to add bookkeeping to the
+# insert's transaction and to publish the chunk atomically with its commit
+CommitBatch = Callable[[Session, int], None]
+
+
+def _commit(db: Session, rows: int) -> None:
+    db.commit()
+
+
+class BatchInsertLoader:
+    """Insert rows through executemany in BATCH_SIZE chunks, one commit per chunk.
+
+    Row tuples go straight to the driver with an INSERT compiled once per
+    column list, so there is no per-row dict or statement compilation;
+    PyMySQL turns each chunk into multi-row INSERT statements.
+    """
+
+    name = "batch"
+
+    def load(
+        self,
+        db: Session,
+        schema: TableSchema,
+        columns: list[str],
+        read_rows: RowSource,
+        commit_batch: CommitBatch = _commit,
+    ) -> int:
+        insert_sql = schema.insert_sql(db.get_bind().dialect, columns)
+        rows_to_insert = []
+        total_inserted = 0
+
+        for row in read_rows():
+            rows_to_insert.append(row)
+
+            if len(rows_to_insert) >= BATCH_SIZE:
+                db.connection().exec_driver_sql(insert_sql, rows_to_insert)
+                commit_batch(db, len(rows_to_insert))
+                total_inserted += len(rows_to_insert)
+                rows_to_insert.clear()
+
+        # Insert remaining rows
+        if rows_to_insert:
+            db.connection().exec_driver_sql(insert_sql, rows_to_insert)
+            commit_batch(db, len(rows_to_insert))
+            total_inserted += len(rows_to_insert)
+
+        return total_inserted
+
+
+class BulkFileLoader:
+    """Write rows to a cleaned temp file and stream it with LOAD DATA LOCAL INFILE.
+
+    Falls back to BatchInsertLoader when the bind is not MySQL or the server
+    refuses local infile; after a refusal the fallback is used for the rest of
+    the process lifetime. Local infile is off unless DB_LOCAL_INFILE=true.
+    """
+
+    name = "bulk"
+
+    def __init__(self, fallback: BatchInsertLoader):
+        self.fallback = fallback
+        self.unavailable = not settings.DB_LOCAL_INFILE
+        self.warned = False
+
+    def load(
+        self,
+        db: Session,
+        schema: TableSchema,
+        columns: list[str],
+        read_rows: RowSource,
+        commit_batch: CommitBatch = _commit,
+    ) -> int:
+        if self.unavailable or db.get_bind().dialect.name != "mysql":
+            if not settings.DB_LOCAL_INFILE and not self.warned:
+                self.warned = True
+                logging.warning("Bulk ingest requested but DB_LOCAL_INFILE is off; using batch inserts")
+            return self.fallback.load(db, schema, columns, read_rows, commit_batch)
+
+        tmp = tempfile.NamedTemporaryFile(
+            mode="w", encoding="utf-8", newline="", suffix=".csv",
+            dir=settings.INGEST_TMP_DIR, delete=False,
+        )
+        try:
+            with tmp:
+                for row in read_rows():
+                    tmp.write(",".join(_field(v) for v in row))
+                    tmp.write("\n")
+
+            column_list = ", ".join(f"`{c}`" for c in columns).replace("%", "%%")
+            load_sql = (
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE `{schema.name}` "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                "LINES TERMINATED BY '\\n' "
+                f"({column_list})"
+            )
+            try:
+                result = db.connection().exec_driver_sql(load_sql, (tmp.name,))
+            except DBAPIError as e:
+                code = e.orig.args[0] if e.orig is not None and e.orig.args else None
+                if code not in LOCAL_INFILE_ERRORS:
+                    raise
+                db.rollback()
+                self.unavailable = True
+                logging.warning(f"LOAD DATA LOCAL INFILE unavailable ({e.orig}); using batch inserts")
+                return self.fallback.load(db, schema, columns, read_rows, commit_batch)
+
+            # LOAD DATA LOCAL behaves like IGNORE: bad values are truncated or coerced
+            # with a warning where batch inserts fail, so refuse the file instead
+            warnings = db.connection().exec_driver_sql("SHOW COUNT(*) WARNINGS").scalar()
+            if warnings:
+                details = db.connection().exec_driver_sql("SHOW WARNINGS LIMIT 3").fetchall()
+                db.rollback()
+                raise ValueError(
+                    f"LOAD DATA into `{schema.name}` gave {warnings} warnings, rolled back: "
+                    + "; ".join(f"{row[1]} {row[2]}" for row in details)
+                )
+
+            commit_batch(db, result.rowcount)
+            return result.rowcount
+        finally:
+            os.remove(tmp.name)
+
+
+def _field(value) -> str:
+    # With ESCAPED BY '' an unquoted NULL is read as SQL NULL and doubled quotes
+    # inside an enclosed field are read as a single quote.
+    if value is None:
+        return "NULL"
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+batch_loader = BatchInsertLoader()
+bulk_loader = BulkFileLoader(batch_loader)
+
+LOADERS = {
+    batch_loader.name: batch_loader,
+    bulk_loader.name: bulk_loader,
+}
+
+
+def get_loader(mode: str | None):
+    loader = LOADERS.get((mode or "").lower())
+    if loader is None:
+        raise ValueError(f"Unknown ingest mode '{mode}'")
+    return loader
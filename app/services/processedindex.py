@@ -0,0 +1,83 @@
+import os
+from datetime import datetime
+from threading import Lock
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database.models.processedFile import ProcessedFile
+
+LOOKUP_CHUNK = 500
+MTIME_TOLERANCE = 1.0  # DATETIME columns drop/round fractional seconds
+
+
+class ProcessedIndex:
+    """In-memory view of a folder's processed files keyed by full path.
+
+    A path counts as processed only if its recorded size and mtime still
+    match the file on disk, so a new file dropped under an old name is
+    ingested again. Loaded once in bulk, updated on every ingest, and only
+    paths it has never seen are resolved against the DB (in batched IN
+    lookups).
+    """
+
+    def __init__(self, folder_id: int):
+        self.folder_id = folder_id
+        self._processed: dict[str, tuple[int | None, float | None]] = {}
+        self._not_processed: set[str] = set()
+        self._lock = Lock()
+
+    def load(self, db: Session) -> int:
+        rows = db.execute(
+            select(ProcessedFile.full_path, ProcessedFile.size, ProcessedFile.mtime).where(
+                ProcessedFile.folder_id == self.folder_id,
+                ProcessedFile.processed == True,
+            )
+        ).all()
+        with self._lock:
+            self._processed = {path: (size, _epoch(mtime)) for path, size, mtime in rows}
+            self._not_processed.clear()
+        return len(rows)
+
+    def contains(self, path: str, st: os.stat_result) -> bool | None:
+        """True/False if known, None if the DB has to be asked."""
+        with self._lock:
+            entry = self._processed.get(path)
+            if entry is None:
+                return False if path in self._not_processed else None
+        size, mtime = entry
+        if size is not None and size != st.st_size:
+            return False
+        if mtime is not None and abs(mtime - st.st_mtime) > MTIME_TOLERANCE:
+            return False
+        return True
+
+    def resolve(self, db: Session, paths: list[str]) -> None:
+        """Fetch DB state for paths the index hasn't seen yet."""
+        with self._lock:
+            unknown = [p for p in paths if p not in self._processed and p not in self._not_processed]
+
+        for i in range(0, len(unknown), LOOKUP_CHUNK):
+            chunk = unknown[i:i + LOOKUP_CHUNK]
+            rows = db.execute(
+                select(ProcessedFile.full_path, ProcessedFile.size, ProcessedFile.mtime).where(
+                    ProcessedFile.folder_id == self.folder_id,
+                    ProcessedFile.processed == True,
+                    ProcessedFile.full_path.in_(chunk),
+                )
+            ).all()
+            with self._lock:
+                for path, size, mtime in rows:
+                    self._processed[path] = (size, _epoch(mtime))
+                found = {row[0] for row in rows}
+                self._not_processed.update(p for p in chunk if p not in found)
+
+    def mark(self, path: str, size: int, mtime: float) -> None:
+        with self._lock:
+            self._processed[path] = (size, mtime)
+            self._not_processed.discard(path)
+
+    def __len__(self) -> int:
+        return len(self._processed)
+
+
+def _epoch(value: datetime | None) -> float | None:
+    return value.timestamp() if value else None
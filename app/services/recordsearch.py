@@ -1,22 +1,153 @@
+import re
+import logging
+import json
+import time
+import base64
+import hashlib
+from concurrent.futures import TimeoutError as FuturesTimeout, as_completed
+from threading import Event
+from typing import Iterator
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from app.appsettings.config import settings
+from app.services.tableregistry import table_registry
+from app.services.columncatalog import column_catalog
+from app.services.executors import get_executor
 
+SEARCH_MODES = ("exact", "prefix", "contains")
+INDEX_KINDS = ("btree", "fulltext")
+# TEXT/BLOB columns can only carry a btree index on a prefix
+TEXT_INDEX_PREFIX = 64
+# innodb ngram_token_size default; shorter values cannot use the FULLTEXT index
+NGRAM_TOKEN_SIZE = 2
+# rows buffered client-side while streaming from a server-side cursor
+STREAM_BUFFER_ROWS = 1000
 
-def search_record(db: Session, table_name: str, column_name: str, search_value: str):
-    valid_columns = get_table_columns(db, table_name)
-    if column_name not in valid_columns:
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class SearchPlan:
+    """WHERE clause, parameters and planned access path for one search.
+
+    `access` says which index the query is written to use, based on the
+    indexes that exist; `explain()` asks MySQL what it actually chose.
+    """
+
+    def __init__(self, table_name: str, column_name: str, search_value: str, mode: str,
+                 where: str, params: dict, access: dict):
+        self.table_name = table_name
+        self.where = where
+        self.params = params
+        self.access = access
+        # ties a continuation token to the search it came from
+        self.key = hashlib.sha1(f"{table_name}\0{column_name}\0{mode}\0{search_value}".encode()).hexdigest()[:16]
+
+    def query(self, after_id: int | None, limit: int | None, timeout_ms: int | None = None):
+        where = self.where
+        params = dict(self.params)
+        if after_id is not None:
+            where += " AND `id` > :after_id"
+            params["after_id"] = after_id
+        hint = f"/*+ MAX_EXECUTION_TIME({timeout_ms}) */ " if timeout_ms else ""
+        sql = f"SELECT {hint}* FROM `{self.table_name}` WHERE {where} ORDER BY `id`"
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        return text(sql), params
+
+    def explain(self, db: Session, after_id: int | None = None, limit: int | None = None) -> list[dict]:
+        """EXPLAIN of the page query: access type, chosen key and estimated rows."""
+        query, params = self.query(after_id, limit)
+        rows = db.execute(text(f"EXPLAIN {query.text}"), params).mappings().all()
+        return [
+            {"table": row["table"], "type": row["type"], "possible_keys": row["possible_keys"],
+             "key": row["key"], "rows": row["rows"], "extra": row["Extra"]}
+            for row in rows
+        ]
+
+
+def plan_search(db: Session, table_name: str, column_name: str, search_value: str, mode: str = "contains") -> SearchPlan:
+    """exact -> `col = value`, prefix -> `col LIKE 'value%'` (both use a btree
+    index on the column), contains -> FULLTEXT ngram match when the column
+    has such an index, otherwise a `LIKE '%value%'` scan.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'")
+    columns = column_catalog.get(db, table_name)
+    if column_name not in columns.name_set:
         raise ValueError(f"Column '{column_name}' does not exist in table '{table_name}'")
 
-    query = text(f"""
-        SELECT * FROM `{table_name}`
-        WHERE `{column_name}` LIKE :search
-        LIMIT 100
-    """)
+    indexes = columns.indexes.get(column_name, {})
+    params = {"search": search_value}
+    access = {"mode": mode, "path": "full_scan", "index": None}
+
+    if mode == "exact":
+        where = f"`{column_name}` = :search"
+        if "btree" in indexes:
+            access.update(path="btree_index", index=indexes["btree"])
+    elif mode == "prefix":
+        where = f"`{column_name}` LIKE :search"
+        params["search"] = _escape_like(search_value) + "%"
+        if "btree" in indexes:
+            access.update(path="btree_index", index=indexes["btree"])
+    else:
+        where = f"`{column_name}` LIKE :search"
+        params["search"] = f"%{_escape_like(search_value)}%"
+        if "fulltext" in indexes and len(search_value) >= NGRAM_TOKEN_SIZE:
+            # the index narrows the candidates, LIKE keeps substring semantics exact
+            where = f"MATCH(`{column_name}`) AGAINST (:phrase IN BOOLEAN MODE) AND {where}"
+            params["phrase"] = '"' + search_value.replace('"', " ") + '"'
+            access.update(path="fulltext_index", index=indexes["fulltext"])
+
+    return SearchPlan(table_name, column_name, search_value, mode, where, params, access)
 
-    rows = db.execute(query, {"search": f"%{search_value}%"}).fetchall()
+
+def encode_cursor(plan: SearchPlan, last_id: int) -> str:
+    raw = json.dumps({"k": plan.key, "id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(plan: SearchPlan, cursor: str | None) -> int | None:
+    if not cursor:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        last_id = int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if data.get("k") != plan.key:
+        raise ValueError("Cursor belongs to a different search")
+    return last_id
+
+
+def search_record(db: Session, table_name: str, column_name: str, search_value: str,
+                  mode: str = "contains", limit: int = 100, cursor: str | None = None,
+                  explain: bool = False):
+    """One page of matches in `id` order: returns (results, planned_access, next_cursor).
+
+    Pages are keyset-based (`id > last id`), so deep pages cost the same as
+    the first one; `next_cursor` is None on the last page. With `explain`
+    the access dict also carries MySQL's EXPLAIN of the page query.
+    """
+    plan = plan_search(db, table_name, column_name, search_value, mode)
+    after_id = decode_cursor(plan, cursor)
+    access = dict(plan.access)
+    if explain:
+        access["explain"] = plan.explain(db, after_id, limit + 1)
+    # one extra row tells whether another page exists
+    query, params = plan.query(after_id, limit + 1)
+
+    rows = db.execute(query, params).fetchall()
     if not rows:
-        return []
+        return [], access, None
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(plan, rows[-1]._mapping["id"])
 
     results = []
     for row in rows:
@@ -26,22 +157,145 @@ def search_record(db: Session, table_name: str, column_name: str, search_value:
             "record": row_dict
         })
 
-    return results
+    return results, access, next_cursor
+
+
+def stream_records(bind, plan: SearchPlan, cursor: str | None = None, limit: int | None = None) -> Iterator[str]:
+    """NDJSON lines, one per matching row, read through a server-side cursor.
+
+    Opens its own connection so it can outlive the request's session. The
+    cursor is checked here, before the response starts.
+    """
+    query, params = plan.query(decode_cursor(plan, cursor), limit)
+
+    def lines() -> Iterator[str]:
+        with bind.connect() as conn:
+            result = conn.execution_options(stream_results=True, max_row_buffer=STREAM_BUFFER_ROWS).execute(query, params)
+            for row in result:
+                yield json.dumps(dict(row._mapping), default=str) + "\n"
+
+    return lines()
+
+
+def tables_with_column(db: Session, column_name: str) -> list[str]:
+    """Data tables from the registry whose cached column catalog has `column_name`."""
+    tables = []
+    for table in table_registry.tables(db.get_bind()):
+        try:
+            columns = column_catalog.get(db, table)
+        except Exception as e:
+            # dropped since the registry last reconciled
+            logging.debug(f"Skipping `{table}` in search: {e}")
+            continue
+        if column_name in columns.name_set:
+            tables.append(table)
+    return tables
+
+
+def _search_table(bind, table_name: str, column_name: str, search_value: str, mode: str,
+                  limit: int, deadline_at: float, stop: Event) -> list[dict]:
+    if stop.is_set():
+        return []
+    with bind.connect() as conn:
+        plan = plan_search(conn, table_name, column_name, search_value, mode)
+        # only the time left until the overall deadline, not the whole budget
+        timeout_ms = int((deadline_at - time.monotonic()) * 1000)
+        if timeout_ms <= 0:
+            raise TimeoutError(f"Deadline reached before `{table_name}` was searched")
+        query, params = plan.query(None, limit, timeout_ms)
+        return [dict(row._mapping) for row in conn.execute(query, params)]
+
+
+def search_all(db: Session, column_name: str, search_value: str, mode: str = "exact",
+               limit: int = 100, deadline: float = 10.0) -> dict:
+    """Search every data table that has `column_name`, concurrently.
+
+    Stops once `limit` records are collected or `deadline` seconds have
+    passed; tables that did not answer by then are listed in `timed_out`.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'")
+    started = time.monotonic()
+    tables = tables_with_column(db, column_name)
+    bind = db.get_bind()
+    stop = Event()
+    deadline_at = started + deadline
+
+    executor = get_executor("search", settings.SEARCH_WORKERS)
+    futures = {
+        executor.submit(_search_table, bind, t, column_name, search_value, mode, limit, deadline_at, stop): t
+        for t in tables
+    }
+    results = []
+    errors = []
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=max(deadline_at - time.monotonic(), 0)):
+            table = futures[future]
+            try:
+                rows = future.result()
+            except TimeoutError:
+                continue  # started too late, reported under timed_out
+            except Exception as e:
+                pending.discard(future)
+                errors.append({"table": table, "error": str(getattr(e, "orig", e))})
+                continue
+            pending.discard(future)
+            results.extend({"table": table, "record": row} for row in rows)
+            if len(results) >= limit:
+                break
+    except FuturesTimeout:
+        pass
+    finally:
+        # queued tables are skipped; running ones end at their MAX_EXECUTION_TIME
+        stop.set()
+        for future in pending:
+            future.cancel()
+
+    truncated = len(results) >= limit
+    return {
+        "results": results[:limit],
+        "tables_searched": len(tables) - len(pending),
+        "tables_with_column": len(tables),
+        "timed_out": [] if truncated else sorted(futures[f] for f in pending),
+        "errors": errors,
+        "truncated": truncated,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+
+
+def create_index(db: Session, table_name: str, column_name: str, kind: str) -> str:
+    """Add a btree or FULLTEXT (ngram) index on one column; returns the index name."""
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind '{kind}'")
+    columns = column_catalog.get(db, table_name)
+    if column_name not in columns.name_set:
+        raise ValueError(f"Column '{column_name}' does not exist in table '{table_name}'")
+
+    existing = columns.indexes.get(column_name, {})
+    if kind in existing:
+        return existing[kind]
 
+    safe = re.sub(r"\W", "_", column_name)[:50]
+    if kind == "btree":
+        name = f"ix_{safe}"
+        is_text = columns.types[column_name].endswith(("text", "blob"))
+        target = f"`{column_name}`({TEXT_INDEX_PREFIX})" if is_text else f"`{column_name}`"
+        sql = f"ALTER TABLE `{table_name}` ADD INDEX `{name}` ({target}), ALGORITHM=INPLACE, LOCK=NONE"
+    else:
+        name = f"ft_{safe}"
+        sql = f"ALTER TABLE `{table_name}` ADD FULLTEXT INDEX `{name}` (`{column_name}`) WITH PARSER ngram"
 
+    db.execute(text(sql))
+    db.commit()
+    column_catalog.invalidate(table_name)
+    return name
 
 
-def get_table_columns(db: Session, table_name: str):
-    """Fetch column names of a given table."""
-    query = text(f"SHOW COLUMNS FROM `{table_name}`")
-    cols = db.execute(query).fetchall()
-    return [c[0] for c in cols]
 
 
 def get_table_columns(db: Session, table_name: str) -> list[str]:
     try:
-        query = text(f"SHOW COLUMNS FROM `{table_name}`")
-        cols = db.execute(query).fetchall()
-        return [c[0] for c in cols]
+        return column_catalog.get(db, table_name).names
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to fetch columns: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to fetch columns: {e}")
@@ -0,0 +1,120 @@
+"""scan_rollups maintenance: ingest-time increments, backfill and consistency checks.
+
+    python -m app.services.rollups backfill [--table NAME]
+    python -m app.services.rollups check [--table NAME]
+"""
+import argparse
+import logging
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal, engine
+from app.database.models.scanrollup import ScanRollup
+from app.database.upsert import upsert_stmt
+from app.services.tableregistry import table_registry
+
+
+def add_rows(db: Session, table_name: str, scanner_id: str, rows: int) -> None:
+    """Count freshly inserted rows for today; caller commits with the insert."""
+    if not rows:
+        return
+    stmt = upsert_stmt(
+        ScanRollup.__table__,
+        db.get_bind().dialect.name,
+        index_elements=["table_name", "scanner_id", "day"],
+        set_=lambda new, c: {"row_count": c.row_count + new.row_count, "updated_at": func.now()},
+    )
+    # CURRENT_DATE comes from the DB clock, like the tables' CreatedAt default
+    db.execute(stmt.values(
+        table_name=table_name,
+        scanner_id=scanner_id or "",
+        day=func.current_date(),
+        row_count=rows,
+    ))
+
+
+def raw_counts(db: Session, table_name: str) -> dict[tuple[str, str], int]:
+    """(scanner_id, 'YYYY-MM-DD') -> rows, computed from the data table itself."""
+    rows = db.execute(text(f"""
+        SELECT COALESCE(ScannerID, ''), DATE(CreatedAt), COUNT(*) FROM `{table_name}`
+        GROUP BY 1, 2
+    """)).fetchall()
+    return {(scanner_id, str(day)): int(cnt) for scanner_id, day, cnt in rows if day is not None}
+
+
+def rollup_counts(db: Session, table_name: str) -> dict[tuple[str, str], int]:
+    rows = db.execute(
+        select(ScanRollup.scanner_id, ScanRollup.day, ScanRollup.row_count)
+        .where(ScanRollup.table_name == table_name)
+    ).all()
+    return {(scanner_id, str(day)): int(cnt) for scanner_id, day, cnt in rows}
+
+
+def backfill(db: Session, table_name: str) -> int:
+    """Rebuild the rollups of one table from its rows.
+
+    Rows ingested into the table while this runs can be counted twice or
+    missed; run `check` afterwards or backfill while the folder is paused.
+    """
+    counts = raw_counts(db, table_name)
+    db.execute(delete(ScanRollup).where(ScanRollup.table_name == table_name))
+    if counts:
+        db.execute(insert(ScanRollup), [
+            {"table_name": table_name, "scanner_id": scanner_id, "day": date.fromisoformat(day), "row_count": cnt}
+            for (scanner_id, day), cnt in counts.items()
+        ])
+    db.commit()
+    return len(counts)
+
+
+def check(db: Session, table_name: str) -> list[dict]:
+    """Differences between the rollups and the raw table, one entry per key."""
+    raw = raw_counts(db, table_name)
+    rolled = rollup_counts(db, table_name)
+    mismatches = []
+    for key in sorted(set(raw) | set(rolled)):
+        if raw.get(key, 0) != rolled.get(key, 0):
+            mismatches.append({
+                "table_name": table_name,
+                "scanner_id": key[0],
+                "day": key[1],
+                "raw": raw.get(key, 0),
+                "rollup": rolled.get(key, 0),
+            })
+    return mismatches
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["backfill", "check"])
+    parser.add_argument("--table", help="only this data table (default: all)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    ScanRollup.__table__.create(bind=engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        tables = [args.table] if args.table else table_registry.tables(engine)
+        if args.command == "backfill":
+            for table in tables:
+                keys = backfill(db, table)
+                logging.info(f"Backfilled {keys} rollup rows for `{table}`")
+            return 0
+
+        totals = defaultdict(int)
+        for table in tables:
+            for m in check(db, table):
+                totals[table] += 1
+                logging.warning(
+                    f"`{table}` scanner={m['scanner_id']!r} day={m['day']}: raw={m['raw']} rollup={m['rollup']}"
+                )
+        for table in tables:
+            logging.info(f"`{table}`: {totals[table]} mismatching keys")
+        return 1 if totals else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+import time
+import heapq
+import logging
+import itertools
+from threading import Condition, Thread
+from typing import Callable
+
+
+class IngestJob:
+    """One file waiting to be ingested. `run` returns True on success."""
+
+    def __init__(
+        self,
+        folder_id: int,
+        table_name: str,
+        file_path: str,
+        run: Callable[[], bool],
+        priority: int = 0,
+        written_at: float | None = None,
+    ):
+        self.folder_id = folder_id
+        self.table_name = table_name
+        self.file_path = file_path
+        self.run = run
+        self.priority = priority
+        self.written_at = written_at  # epoch mtime of the finished file, for end-to-end latency
+        self.enqueued_at = time.monotonic()
+
+
+class IngestScheduler:
+    """Bounded priority queue of ingest jobs drained by a fixed worker pool.
+
+    At most one job per folder runs at a time (files of a folder are ingested
+    in submission order) and at most `table_concurrency` jobs write to the
+    same table concurrently. Jobs of idle folders/tables are picked by
+    (priority, submission order).
+    """
+
+    def __init__(self, workers: int, max_queued: int, table_concurrency: int):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.table_concurrency = table_concurrency
+
+        self._cond = Condition()
+        self._seq = itertools.count()
+        self._folder_queues: dict[int, list] = {}
+        self._busy_folders: set[int] = set()
+        self._table_active: dict[str, int] = {}
+        self._paths: set[str] = set()  # queued or running
+        self._queued = 0
+        self._threads: list[Thread] = []
+        self._stopping = False
+
+        # metrics
+        self._started_at = time.monotonic()
+        self._busy_workers = 0
+        self._busy_seconds = 0.0
+        self._completed = 0
+        self._failed = 0
+        self._dispatched = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_last = 0.0
+        self._latency_count = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._started_at = time.monotonic()
+            for i in range(self.workers):
+                t = Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+                self._threads.append(t)
+                t.start()
+        logging.info(f"Started {self.workers} ingestion workers")
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._folder_queues.clear()
+            self._paths.clear()
+            self._queued = 0
+            self._threads = []
+            self._cond.notify_all()
+
+    def submit(self, job: IngestJob, timeout: float | None = None) -> bool:
+        """Queue a job; False if the file is already queued/running or the queue stayed full."""
+        with self._cond:
+            if job.file_path in self._paths:
+                return False
+            if not self._cond.wait_for(lambda: self._queued < self.max_queued or self._stopping, timeout):
+                return False
+            if self._stopping:
+                return False
+
+            job.enqueued_at = time.monotonic()
+            heapq.heappush(
+                self._folder_queues.setdefault(job.folder_id, []),
+                (job.priority, next(self._seq), job),
+            )
+            self._paths.add(job.file_path)
+            self._queued += 1
+            self._cond.notify_all()
+            return True
+
+    def is_pending(self, file_path: str) -> bool:
+        with self._cond:
+            return file_path in self._paths
+
+    def cancel_folder(self, folder_id: int, wait: bool = False) -> int:
+        """Drop queued jobs of a folder, optionally waiting for its running job to finish."""
+        with self._cond:
+            dropped = self._folder_queues.pop(folder_id, [])
+            for _, _, job in dropped:
+                self._paths.discard(job.file_path)
+            self._queued -= len(dropped)
+            self._cond.notify_all()
+            if wait:
+                self._cond.wait_for(lambda: folder_id not in self._busy_folders)
+        return len(dropped)
+
+    def stats(self) -> dict:
+        with self._cond:
+            elapsed = max(time.monotonic() - self._started_at, 1e-6)
+            return {
+                "queue_depth": self._queued,
+                "queue_capacity": self.max_queued,
+                "workers": self.workers,
+                "busy_workers": self._busy_workers,
+                "worker_utilization": round(self._busy_seconds / (elapsed * self.workers), 4),
+                "jobs_completed": self._completed,
+                "jobs_failed": self._failed,
+                "wait_seconds_avg": round(self._wait_total / self._dispatched, 3) if self._dispatched else 0.0,
+                "wait_seconds_max": round(self._wait_max, 3),
+                "wait_seconds_last": round(self._wait_last, 3),
+                # file written -> rows committed
+                "latency_seconds_avg": round(self._latency_total / self._latency_count, 3) if self._latency_count else 0.0,
+                "latency_seconds_max": round(self._latency_max, 3),
+                "latency_seconds_last": round(self._latency_last, 3),
+                "queued_per_folder": {fid: len(q) for fid, q in self._folder_queues.items() if q},
+                "active_per_table": {t: n for t, n in self._table_active.items() if n},
+            }
+
+    def _next_job(self) -> IngestJob | None:
+        best = None
+        for folder_id, queue in self._folder_queues.items():
+            if not queue or folder_id in self._busy_folders:
+                continue
+            head = queue[0]
+            if self._table_active.get(head[2].table_name, 0) >= self.table_concurrency:
+                continue
+            if best is None or head[:2] < best[:2]:
+                best = head
+
+        if best is None:
+            return None
+
+        job = best[2]
+        heapq.heappop(self._folder_queues[job.folder_id])
+        self._queued -= 1
+        self._busy_folders.add(job.folder_id)
+        self._table_active[job.table_name] = self._table_active.get(job.table_name, 0) + 1
+        self._busy_workers += 1
+        self._cond.notify_all()  # wake submitters waiting for space
+        return job
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    if self._stopping:
+                        return
+                    self._cond.wait()
+                    job = self._next_job()
+
+                waited = time.monotonic() - job.enqueued_at
+                self._dispatched += 1
+                self._wait_total += waited
+                self._wait_last = waited
+                self._wait_max = max(self._wait_max, waited)
+
+            started = time.monotonic()
+            ok = False
+            try:
+                ok = job.run()
+            except Exception as e:
+                logging.error(f"Ingest job failed for {job.file_path}: {e}")
+            finally:
+                with self._cond:
+                    self._busy_seconds += time.monotonic() - started
+                    self._busy_workers -= 1
+                    self._busy_folders.discard(job.folder_id)
+                    self._table_active[job.table_name] -= 1
+                    self._paths.discard(job.file_path)
+                    if ok:
+                        self._completed += 1
+                        if job.written_at is not None:
+                            latency = time.time() - job.written_at
+                            self._latency_count += 1
+                            self._latency_total += latency
+                            self._latency_last = latency
+                            self._latency_max = max(self._latency_max, latency)
+                    else:
+                        self._failed += 1
+                    self._cond.notify_all()
@@ -0,0 +1,89 @@
+import time
+import logging
+from threading import Lock
+from sqlalchemy import MetaData, Table
+from sqlalchemy.engine import Dialect, Engine
+from app.appsettings.config import settings
+
+
+class TableSchema:
+    """Reflected table plus everything ingestion derives from it."""
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.name = table.name
+        # normalized name -> real DB column name
+        self.col_map = {col.lower().replace(" ", "_"): col for col in table.columns.keys()}
+        # (dialect, columns) -> positional INSERT for exec_driver_sql
+        self._insert_sql: dict[tuple[str, tuple[str, ...]], str] = {}
+        self.loaded_at = time.monotonic()
+
+    def insert_sql(self, dialect: Dialect, columns: list[str]) -> str:
+        """INSERT with one positional placeholder per column, built once per column list."""
+        key = (dialect.name, tuple(columns))
+        sql = self._insert_sql.get(key)
+        if sql is None:
+            # the preparer already doubles % for format paramstyles (PyMySQL)
+            quote = dialect.identifier_preparer.quote
+            placeholder = "?" if dialect.paramstyle == "qmark" else "%s"
+            sql = (
+                f"INSERT INTO {quote(self.name)} ({', '.join(quote(c) for c in columns)}) "
+                f"VALUES ({', '.join([placeholder] * len(columns))})"
+            )
+            self._insert_sql[key] = sql
+        return sql
+
+
+class SchemaCache:
+    """Process-wide, thread-safe cache of reflected ingestion tables.
+
+    Each table is reflected into its own MetaData so watcher threads never
+    mutate the shared declarative Base.metadata. Entries are dropped
+    explicitly by the table routes and refreshed after `ttl` seconds to pick
+    up changes made outside the API.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, TableSchema] = {}
+        self._lock = Lock()
+        self._reflect_lock = Lock()
+
+    def get(self, engine: Engine, table_name: str) -> TableSchema:
+        schema = self._fresh(table_name)
+        if schema:
+            return schema
+
+        # Serialize reflection so concurrent misses only hit information_schema once
+        with self._reflect_lock:
+            schema = self._fresh(table_name)
+            if schema:
+                return schema
+
+            metadata = MetaData()
+            metadata.reflect(bind=engine, only=[table_name])
+            if table_name not in metadata.tables:
+                raise ValueError(f"Table '{table_name}' does not exist in the database")
+
+            schema = TableSchema(metadata.tables[table_name])
+            with self._lock:
+                self._entries[table_name] = schema
+            logging.info(f"Cached schema for table `{table_name}`")
+            return schema
+
+    def invalidate(self, table_name: str | None = None) -> None:
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(table_name, None)
+
+    def _fresh(self, table_name: str) -> TableSchema | None:
+        with self._lock:
+            schema = self._entries.get(table_name)
+        if schema and time.monotonic() - schema.loaded_at < self.ttl:
+            return schema
+        return None
+
+
+schema_cache = SchemaCache(settings.SCHEMA_CACHE_TTL)
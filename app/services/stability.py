@@ -0,0 +1,77 @@
+import os
+import time
+from threading import Lock
+
+
+class FileState:
+    __slots__ = ("size", "mtime_ns", "changed_at")
+
+    def __init__(self, size: int, mtime_ns: int, changed_at: float):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.changed_at = changed_at
+
+
+class StabilityTracker:
+    """Decides when a file is done being written.
+
+    A file is eligible once its size and mtime stayed the same for
+    `quiet_seconds` of observation, or (when `probe` is on) once it can be
+    renamed onto itself, which fails on Windows while the scanner still holds
+    it open. The file's own mtime is not trusted: copies that preserve it
+    look old while still being written. Only files that are not yet eligible
+    are tracked, so callers just pass in the stat results they already have.
+    """
+
+    def __init__(self, quiet_seconds: float, probe: bool):
+        self.quiet_seconds = quiet_seconds
+        self.probe = probe
+        self._states: dict[str, FileState] = {}
+        self._lock = Lock()
+
+    def is_stable(self, path: str, st: os.stat_result) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            state = self._states.get(path)
+            if state is None:
+                self._states[path] = FileState(st.st_size, st.st_mtime_ns, now)
+            elif state.size != st.st_size or state.mtime_ns != st.st_mtime_ns:
+                state.size, state.mtime_ns, state.changed_at = st.st_size, st.st_mtime_ns, now
+            elif now - state.changed_at >= self.quiet_seconds:
+                del self._states[path]
+                return True
+
+        if self.probe and _exclusive_rename(path):
+            self.forget(path)
+            return True
+        return False
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            self._states.pop(path, None)
+
+    def retain(self, paths: set[str]) -> None:
+        """Drop state for files that no longer exist in the folder."""
+        with self._lock:
+            for path in [p for p in self._states if p not in paths]:
+                del self._states[path]
+
+    def pending(self) -> list[str]:
+        with self._lock:
+            return list(self._states)
+
+    def next_due(self) -> float | None:
+        """Seconds until the earliest tracked file can become eligible."""
+        with self._lock:
+            if not self._states:
+                return None
+            oldest = min(s.changed_at for s in self._states.values())
+        return max(oldest + self.quiet_seconds - time.monotonic(), 0.0)
+
+
+def _exclusive_rename(path: str) -> bool:
+    try:
+        os.rename(path, path)
+        return True
+    except OSError:
+        return False
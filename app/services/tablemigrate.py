@@ -0,0 +1,149 @@
+"""Upgrade existing data tables to the index-friendly system column layout.
+
+    python -m app.services.tablemigrate [--table NAME] [--dry-run] [--allow-blocking]
+
+The (ScannerID, CreatedAt) and CreatedAt indexes are added online
+(ALGORITHM=INPLACE, LOCK=NONE). Changing ScannerID to VARCHAR(64) rebuilds
+the table with writes blocked for the whole copy, so it only runs with
+--allow-blocking; until then a TEXT ScannerID is indexed on a 64-char
+prefix. EXPLAIN plans of the dashboard queries are logged before and after
+each table is changed.
+"""
+import argparse
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database.connection import SessionLocal
+from app.services.tableregistry import table_registry
+
+SCANNER_ID_LENGTH = 64
+SCANNER_ID_TYPE = f"VARCHAR({SCANNER_ID_LENGTH})"
+
+# (name, columns) - used by /tables/create and by the migration
+INDEXES = [
+    ("ix_scanner_created", ("ScannerID", "CreatedAt")),
+    ("ix_created", ("CreatedAt",)),
+]
+SYSTEM_INDEXES = [
+    f"INDEX `{name}` ({', '.join(f'`{c}`' for c in cols)})" for name, cols in INDEXES
+]
+
+EXPLAIN_QUERIES = {
+    "today_total": "SELECT COUNT(*) FROM `{table}` WHERE CreatedAt >= :day_start AND CreatedAt < :day_end",
+    "today_per_scanner": (
+        "SELECT ScannerID, COUNT(*) FROM `{table}` "
+        "WHERE CreatedAt >= :day_start AND CreatedAt < :day_end GROUP BY ScannerID"
+    ),
+}
+
+
+def explain(db: Session, table: str) -> dict[str, list[dict]]:
+    day_start = datetime.combine(datetime.now().date(), datetime.min.time())
+    params = {"day_start": day_start, "day_end": day_start + timedelta(days=1)}
+    plans = {}
+    for name, sql in EXPLAIN_QUERIES.items():
+        rows = db.execute(text("EXPLAIN " + sql.format(table=table)), params).mappings().all()
+        plans[name] = [
+            {k: row.get(k) for k in ("type", "possible_keys", "key", "rows", "Extra")} for row in rows
+        ]
+    return plans
+
+
+def pending_changes(db: Session, table: str, allow_blocking: bool = False) -> tuple[str | None, list[str]]:
+    """(column type change or None, ADD INDEX clauses) still needed for `table`."""
+    columns = {
+        row[0]: (row[1] or "").lower()
+        for row in db.execute(text("""
+            SELECT column_name, data_type FROM information_schema.columns
+            WHERE table_schema = DATABASE() AND table_name = :table
+        """), {"table": table}).fetchall()
+    }
+    if "ScannerID" not in columns or "CreatedAt" not in columns:
+        return None, []
+
+    modify = None
+    if columns["ScannerID"] != "varchar":
+        longest = db.execute(text(f"SELECT MAX(CHAR_LENGTH(`ScannerID`)) FROM `{table}`")).scalar() or 0
+        if longest > SCANNER_ID_LENGTH:
+            logging.warning(f"`{table}`: ScannerID values up to {longest} chars, leaving column type as is")
+        elif not allow_blocking:
+            logging.warning(f"`{table}`: ScannerID is {columns['ScannerID']}; "
+                            f"rerun with --allow-blocking to change it to {SCANNER_ID_TYPE}")
+        else:
+            modify = f"MODIFY `ScannerID` {SCANNER_ID_TYPE}"
+    # TEXT/BLOB columns can only be indexed on a prefix (error 1170 otherwise)
+    prefixed = modify is None and columns["ScannerID"].endswith(("text", "blob"))
+
+    # index name -> ordered column list
+    existing = {}
+    for row in db.execute(text(f"SHOW INDEX FROM `{table}`")).mappings().all():
+        existing.setdefault(row["Key_name"], []).append((row["Seq_in_index"], row["Column_name"]))
+    leading = {tuple(c for _, c in sorted(cols)) for cols in existing.values()}
+
+    indexes = []
+    for name, cols in INDEXES:
+        if not any(lead[:len(cols)] == cols for lead in leading):
+            parts = [
+                f"`{c}`({SCANNER_ID_LENGTH})" if prefixed and c == "ScannerID" else f"`{c}`" for c in cols
+            ]
+            indexes.append(f"ADD INDEX `{name}` ({', '.join(parts)})")
+    return modify, indexes
+
+
+def migrate_table(db: Session, table: str, dry_run: bool = False, allow_blocking: bool = False) -> bool:
+    modify, indexes = pending_changes(db, table, allow_blocking)
+    if not modify and not indexes:
+        logging.info(f"`{table}`: already up to date")
+        return False
+
+    statements = []
+    if modify:
+        # rebuilds the table; reads stay allowed, writes wait until it finishes
+        statements.append(f"ALTER TABLE `{table}` {modify}, ALGORITHM=COPY, LOCK=SHARED")
+    if indexes:
+        statements.append(f"ALTER TABLE `{table}` {', '.join(indexes)}, ALGORITHM=INPLACE, LOCK=NONE")
+
+    logging.info(f"`{table}`: plan before {explain(db, table)}")
+    if dry_run:
+        for sql in statements:
+            logging.info(f"`{table}`: would run {sql}")
+        return False
+
+    for sql in statements:
+        logging.info(f"`{table}`: {sql}")
+        db.execute(text(sql))
+        db.commit()
+    logging.info(f"`{table}`: plan after {explain(db, table)}")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--table", help="only this data table (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="show plans and ALTER statements only")
+    parser.add_argument("--allow-blocking", action="store_true",
+                        help="also change ScannerID to VARCHAR(64) (table copy, blocks writes)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    db = SessionLocal()
+    try:
+        tables = [args.table] if args.table else table_registry.tables(db.get_bind())
+        changed = 0
+        failed = []
+        for table in tables:
+            try:
+                changed += migrate_table(db, table, args.dry_run, args.allow_blocking)
+            except Exception as e:
+                db.rollback()
+                failed.append(table)
+                logging.error(f"`{table}`: migration failed: {e}")
+        logging.info(f"Migrated {changed} of {len(tables)} tables" + (f", failed: {failed}" if failed else ""))
+        return 1 if failed else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+import logging
+from threading import Event, Lock, Thread
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.database.connection import Base
+
+
+class TableRegistry:
+    """Process-wide list of scanner data tables.
+
+    A data table is any table with a ScannerID column that is not one of the
+    app's own model tables. The list is loaded once, kept current by the
+    table routes and reconciled against the database every `interval`
+    seconds to pick up tables created or dropped outside the API.
+    """
+
+    def __init__(self):
+        self._tables: set[str] | None = None
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread: Thread | None = None
+
+    def tables(self, bind: Engine) -> list[str]:
+        with self._lock:
+            tables = self._tables
+        if tables is None:
+            tables = self.refresh(bind)
+        return sorted(tables)
+
+    def refresh(self, bind: Engine) -> set[str]:
+        with bind.connect() as conn:
+            rows = conn.execute(text("""
+                SELECT DISTINCT table_name FROM information_schema.columns
+                WHERE table_schema = DATABASE() AND column_name = 'ScannerID'
+            """)).fetchall()
+        tables = {row[0] for row in rows if not self.is_system_table(row[0])}
+
+        with self._lock:
+            previous = self._tables
+            self._tables = tables
+        if previous is not None and previous != tables:
+            logging.info(
+                f"Table registry reconciled: added {sorted(tables - previous)}, removed {sorted(previous - tables)}"
+            )
+        return tables
+
+    def add(self, table_name: str) -> None:
+        with self._lock:
+            if self._tables is not None:
+                self._tables.add(table_name)
+
+    def remove(self, table_name: str) -> None:
+        with self._lock:
+            if self._tables is not None:
+                self._tables.discard(table_name)
+
+    @staticmethod
+    def is_system_table(table_name: str) -> bool:
+        return table_name.lower() in {name.lower() for name in Base.metadata.tables}
+
+    def start(self, bind: Engine, interval: float) -> None:
+        self.refresh(bind)
+        if self._thread or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = Thread(target=self._reconcile, args=(bind, interval), name="table-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread = None
+
+    def _reconcile(self, bind: Engine, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh(bind)
+            except Exception as e:
+                logging.error(f"Table registry refresh failed: {e}")
+
+
+table_registry = TableRegistry()
@@ -1,71 +1,323 @@
 import os
 import time
-from threading import Thread
+from threading import Event, Lock, Thread
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.database.models.folders import Folder
 from app.database.connection import SessionLocal
 from app.database.models.processedFile import ProcessedFile
+from app.database.upsert import upsert_stmt
 from app.services.ingestcsv import ingest_csv
-import shutil,logging
+from app.services.scheduler import IngestJob, IngestScheduler
+from app.services.stability import StabilityTracker
+from app.services.processedindex import ProcessedIndex
+from app.services.encodings import get_profile
+from app.services.archiver import ArchiveJob, Archiver
+from app.services import approxcounts, encodings
+from app.appsettings.config import settings
+import logging
+
+
+class FailedFile:
+    __slots__ = ("failures", "retry_at", "size", "mtime_ns")
+
+    def __init__(self, failures: int, retry_at: float, size: int, mtime_ns: int):
+        self.failures = failures
+        self.retry_at = retry_at
+        self.size = size
+        self.mtime_ns = mtime_ns
 
 
 class FolderWatcher(Thread):
-    def __init__(self, folder_id: int, folder_path: str):
+    """Discovers new CSVs in a folder and hands them to the shared IngestScheduler."""
+
+    def __init__(self, folder_id: int, folder_path: str, scheduler: IngestScheduler, archiver: Archiver):
         super().__init__(daemon=True)
         self.folder_id = folder_id
         self.folder_path = folder_path
-        self.stop_flag = False
-        self.processed_files = set()
+        self.scheduler = scheduler
+        self.archiver = archiver
+        self._stop_event = Event()
+        self.index = ProcessedIndex(folder_id)
+        self.table_name = ""
+        self.watch_mode = settings.WATCH_MODE
+        self._dir_mtime = None
+        self._outstanding = True
+        self.stability = StabilityTracker(settings.FILE_QUIET_SECONDS, settings.FILE_LOCK_PROBE)
+        # files whose last ingest failed, retried with exponential backoff
+        self._failed: dict[str, FailedFile] = {}
+        self._failed_lock = Lock()
 
         # Load already processed files from DB at startup
         db: Session = SessionLocal()
         try:
-            existing = db.query(ProcessedFile.full_path).filter_by(
-                folder_id=folder_id, processed=True
-            ).all()
-            self.processed_files = {os.path.basename(row[0]) for row in existing}
-            logging.info(f"Loaded {len(self.processed_files)} already-processed files from DB for {self.folder_path}")
+            folder = db.query(Folder).filter_by(id=folder_id).first()
+            if folder:
+                self.table_name = folder.table_name
+                self.watch_mode = folder.watch_mode or settings.WATCH_MODE
+            loaded = self.index.load(db)
+            logging.info(f"Loaded {loaded} already-processed files from DB for {self.folder_path}")
         finally:
             db.close()
 
+    @property
+    def stop_flag(self) -> bool:
+        return self._stop_event.is_set()
+
+    @stop_flag.setter
+    def stop_flag(self, value: bool):
+        if value:
+            self._stop_event.set()
+        else:
+            self._stop_event.clear()
+
+    def resolve_watch_mode(self) -> str:
+        if self.watch_mode != "auto":
+            return self.watch_mode
+        # change notifications don't reach us over SMB/UNC shares
+        if self.folder_path.startswith(("\\\\", "//")):
+            return "poll"
+        return "events"
+
     def run(self):
-        logging.info(f" Watching folder: {self.folder_path}")
-        while not self.stop_flag:
+        mode = self.resolve_watch_mode()
+        logging.info(f" Watching folder: {self.folder_path} (mode={mode})")
+        if mode == "events":
+            try:
+                self._run_events()
+            except Exception as e:
+                logging.warning(f"Event watching unavailable for {self.folder_path} ({e}); falling back to polling")
+        self._run_polling()
+
+    def _run_events(self):
+        from watchfiles import Change, watch
+
+        logging.getLogger("watchfiles").setLevel(logging.WARNING)  # it logs every change batch at INFO
+        self.scan(force=True)
+        last_full = time.monotonic()
+        # Time out often enough to recheck files still inside their quiet window;
+        # a full listing only happens every WATCH_RESCAN_SECONDS for retries and missed events.
+        timeout = max(min(settings.FILE_QUIET_SECONDS, settings.WATCH_RESCAN_SECONDS), 0.1)
+        for changes in watch(
+            self.folder_path,
+            watch_filter=lambda change, path: change != Change.deleted and path.endswith(".csv"),
+            debounce=settings.WATCH_DEBOUNCE_MS,
+            step=settings.WATCH_DEBOUNCE_MS,
+            rust_timeout=int(timeout * 1000),
+            yield_on_timeout=True,
+            stop_event=self._stop_event,
+            recursive=False,
+        ):
+            if self.stop_flag:
+                return
             try:
-                # get all CSV files in the folder
-                files = sorted(
-                    [f for f in os.listdir(self.folder_path) if f.endswith(".csv")]
+                for path in sorted({os.path.basename(p) for _, p in changes}):
+                    self._offer_path(os.path.join(self.folder_path, path))
+                self._recheck()
+            except Exception as e:
+                logging.error(f" Error watching {self.folder_path}: {e}")
+
+            if time.monotonic() - last_full >= settings.WATCH_RESCAN_SECONDS:
+                self.scan(force=True)
+                last_full = time.monotonic()
+
+    def _run_polling(self):
+        # Adaptive: tighten to POLL_MIN_INTERVAL while files arrive, back off while idle
+        interval = settings.POLL_MIN_INTERVAL
+        last_full = time.monotonic()
+        while not self.stop_flag:
+            force = time.monotonic() - last_full >= settings.WATCH_RESCAN_SECONDS
+            if force:
+                last_full = time.monotonic()
+            if self.scan(force):
+                interval = settings.POLL_MIN_INTERVAL
+            else:
+                interval = min(interval * 2, settings.POLL_MAX_INTERVAL)
+
+            # wake up when the next file still being written may have gone quiet,
+            # or when a failed file is due for its retry
+            dues = [d for d in (self.stability.next_due(), self._next_retry()) if d is not None]
+            self._stop_event.wait(min([interval] + [max(d, 0.05) for d in dues]))
+
+    def scan(self, force: bool = False) -> bool:
+        """List the folder and queue stable new files. Returns True if anything changed."""
+        try:
+            dir_mtime = os.stat(self.folder_path).st_mtime_ns
+            changed = dir_mtime != self._dir_mtime
+            if not force and not changed:
+                # unchanged directory: only re-stat files waiting to become stable,
+                # and skip the listing entirely if nothing is left over
+                if self.stability.pending():
+                    return self._recheck() > 0
+                if not self._outstanding:
+                    return False
+            # the first listing and every full rescan also pick up archive jobs lost
+            # to a crash or shutdown: processed files still sitting in the folder
+            replay_archive = force or self._dir_mtime is None
+            self._dir_mtime = dir_mtime
+            self._outstanding = False
+
+            # get all CSV files in the folder
+            with os.scandir(self.folder_path) as it:
+                entries = sorted(
+                    (e for e in it if e.name.endswith(".csv") and e.is_file()),
+                    key=lambda e: e.name,
                 )
+            listed = {e.path for e in entries}
+            self.stability.retain(listed)
+            with self._failed_lock:
+                for path in [p for p in self._failed if p not in listed]:
+                    del self._failed[path]
 
-                if not files:
-                    time.sleep(5)
+            candidates = []
+            unknown = []
+            for entry in entries:
+                st = entry.stat()
+                known = self.index.contains(entry.path, st)
+                if known is None:
+                    unknown.append(entry.path)
+                if not known:
+                    candidates.append((entry.path, st))
+                elif replay_archive:
+                    self._archive(entry.path)
+            if unknown:
+                self._resolve(unknown)
+
+            submitted = 0
+            for file_path, st in candidates:
+                if self.index.contains(file_path, st):
+                    if replay_archive:
+                        self._archive(file_path)
                     continue
+                offered = self._offer(file_path, st)
+                if offered is None:
+                    break  # queue full, retry on the next cycle
+                submitted += offered
 
-                # process all EXCEPT the newest (last one)
-                for fname in files[:-1]:
-                    file_path = os.path.join(self.folder_path, fname)
+            return changed or submitted > 0
 
-                    # Double check with DB
-                    db: Session = SessionLocal()
-                    already_done = db.query(ProcessedFile).filter_by(
-                        folder_id=self.folder_id,
-                        full_path=file_path,
-                        processed=True
-                    ).first()
-                    db.close()
+        except Exception as e:
+            logging.error(f" Error watching {self.folder_path}: {e}")
+            self._outstanding = True
+            return False
 
-                    if already_done:
-                        continue  # skip, already processed
+    def _recheck(self) -> int:
+        submitted = 0
+        for file_path in self.stability.pending():
+            offered = self._offer_path(file_path)
+            if offered is None:
+                break
+            submitted += offered
+        return submitted
 
-                    if fname not in self.processed_files:
-                        if self.process_csv(file_path):
-                            self.processed_files.add(fname)
+    def _resolve(self, paths: list[str]) -> None:
+        # one batched IN lookup for paths the index has never seen
+        db: Session = SessionLocal()
+        try:
+            self.index.resolve(db, paths)
+        finally:
+            db.close()
 
-            except Exception as e:
-                logging.error(f" Error watching {self.folder_path}: {e}")
+    def is_processed(self, file_path: str) -> bool:
+        st = os.stat(file_path)
+        if self.index.contains(file_path, st) is None:
+            self._resolve([file_path])
+        return bool(self.index.contains(file_path, st))
+
+    def _offer_path(self, file_path: str) -> int | None:
+        try:
+            if self.is_processed(file_path):
+                self.stability.forget(file_path)
+                return 0
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            self.stability.forget(file_path)
+            return 0
+        return self._offer(file_path, st)
+
+    def _offer(self, file_path: str, st: os.stat_result) -> int | None:
+        """Queue a file once it is stable: 1 if queued, 0 if not (yet), None if the queue is full.
+
+        Retries of a failed file return 0 as well, so they don't count as
+        folder activity and keep the poll interval short.
+        """
+        self._outstanding = True
+        if self.scheduler.is_pending(file_path):
+            return 0
+        retry = self._retry_state(file_path, st)
+        if retry is False:
+            return 0
+        if not self.stability.is_stable(file_path, st):
+            return 0
+
+        job = IngestJob(
+            self.folder_id, self.table_name, file_path,
+            run=lambda: self._run_job(file_path),
+            written_at=st.st_mtime,
+        )
+        if not self.scheduler.submit(job, timeout=1):
+            return None
+        return 0 if retry else 1
+
+    def _retry_state(self, file_path: str, st: os.stat_result) -> bool | None:
+        """None: never failed (or changed since), True: retry is due, False: still backing off."""
+        with self._failed_lock:
+            failed = self._failed.get(file_path)
+            if failed is None:
+                return None
+            if failed.size != st.st_size or failed.mtime_ns != st.st_mtime_ns:
+                del self._failed[file_path]  # rewritten, try it as a new file
+                return None
+            return time.monotonic() >= failed.retry_at
 
-            time.sleep(5)  # check every 5 seconds
+    def _next_retry(self) -> float | None:
+        """Seconds until the earliest failed file may be retried."""
+        with self._failed_lock:
+            if not self._failed:
+                return None
+            earliest = min(f.retry_at for f in self._failed.values())
+        return max(earliest - time.monotonic(), 0.0)
+
+    def _record_failure(self, file_path: str) -> None:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return
+        with self._failed_lock:
+            previous = self._failed.get(file_path)
+            failures = previous.failures + 1 if previous else 1
+            delay = min(settings.INGEST_RETRY_MIN_SECONDS * 2 ** (failures - 1), settings.INGEST_RETRY_MAX_SECONDS)
+            self._failed[file_path] = FailedFile(failures, time.monotonic() + delay, st.st_size, st.st_mtime_ns)
+        logging.warning(f"{file_path} failed {failures} time(s); next retry in {delay:.0f}s")
+
+    def failing_files(self) -> int:
+        with self._failed_lock:
+            return len(self._failed)
+
+    def _archive(self, file_path: str) -> None:
+        """Queue the backup copy + move into Done/ on the archiver's own threads."""
+        if self.archiver.is_pending(file_path):
+            return
+        filename = os.path.basename(file_path)
+        job = ArchiveJob(
+            file_path,
+            copy_dest=os.path.join(settings.COPY_FILE_PATH, os.path.basename(self.folder_path), filename),
+            done_dest=os.path.join(self.folder_path, "Done", filename),
+        )
+        if not self.archiver.submit(job, timeout=1):
+            # still processed and in the folder, so the next full rescan queues it again
+            logging.warning(f"Archive queue full, {file_path} stays in place for now")
+
+    def _run_job(self, file_path: str) -> bool:
+        if self.stop_flag:
+            return False
+        ok = self.process_csv(file_path)
+        if ok:
+            with self._failed_lock:
+                self._failed.pop(file_path, None)
+        elif not self.stop_flag:
+            self._record_failure(file_path)
+        return ok
 
     def process_csv(self, file_path: str) -> bool:
         logging.info(f" Processing {file_path}")
@@ -82,34 +334,39 @@ class FolderWatcher(Thread):
             if not table_name:
                 raise ValueError(f"Folder {self.folder_id} has no table_name set")
 
+            st = os.stat(file_path)
+            mtime = datetime.fromtimestamp(st.st_mtime)
+
             # 🔹 Call ingest_csv with table name + scanner_id
-            total_inserted = ingest_csv(file_path, db, table_name, scanner_id)
-
-            #  Save/update record in DB
-            pf = db.query(ProcessedFile).filter_by(
-                folder_id=self.folder_id,
-                full_path=file_path
-            ).first()
-
-            if not pf:
-                pf = ProcessedFile(
-                    folder_id=self.folder_id,
-                    filename=os.path.basename(file_path),
-                    full_path=file_path,
-                    processed=True,
-                    mtime=datetime.fromtimestamp(os.path.getmtime(file_path))
-                )
-                db.add(pf)
-            else:
-                pf.processed = True
-                pf.mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
+            profile = get_profile(self.folder_id, folder.encoding)
+            total_inserted = ingest_csv(file_path, db, table_name, scanner_id, folder.ingest_mode, profile)
+            if profile.encoding and folder.encoding != profile.encoding:
+                folder.encoding = profile.encoding  # cache the learned profile, committed below
+
+            #  Save/update record in DB; an upsert, since the background seeder
+            #  may insert the same (folder_id, full_path) row at any moment
+            db.execute(
+                upsert_stmt(
+                    ProcessedFile.__table__,
+                    db.get_bind().dialect.name,
+                    index_elements=["folder_id", "full_path"],
+                    set_=lambda new, c: {"processed": True, "mtime": new.mtime, "size": new.size},
+                ),
+                {
+                    "folder_id": self.folder_id,
+                    "filename": os.path.basename(file_path),
+                    "full_path": file_path,
+                    "processed": True,
+                    "mtime": mtime,
+                    "size": st.st_size,
+                },
+            )
 
             db.commit()
-            done_dir = os.path.join(self.folder_path, "Done")
-            os.makedirs(done_dir, exist_ok=True)
-            new_path = os.path.join(done_dir, os.path.basename(file_path))
-            shutil.move(file_path, new_path)
-            
+            self.index.mark(file_path, st.st_size, st.st_mtime)
+            approxcounts.record_ingest(total_inserted)
+            self._archive(file_path)
+
             logging.info(f"Inserted {total_inserted} rows and marked as processed in DB: {file_path}")
             return True
 
@@ -124,10 +381,23 @@ class FolderWatcher(Thread):
 class FolderWatcherManager:
     def __init__(self):
         self.watchers: dict[int, FolderWatcher] = {}
+        self.scheduler = IngestScheduler(
+            workers=settings.INGEST_WORKERS,
+            max_queued=settings.INGEST_QUEUE_SIZE,
+            table_concurrency=settings.INGEST_TABLE_CONCURRENCY,
+        )
+        self.archiver = Archiver(
+            workers=settings.ARCHIVE_WORKERS,
+            max_queued=settings.ARCHIVE_QUEUE_SIZE,
+            retries=settings.ARCHIVE_RETRIES,
+            compress=settings.ARCHIVE_COMPRESS,
+        )
 
     def start(self, folder_id: int, path: str):
+        self.scheduler.start()
+        self.archiver.start()
         if folder_id not in self.watchers:
-            watcher = FolderWatcher(folder_id, path)
+            watcher = FolderWatcher(folder_id, path, self.scheduler, self.archiver)
             self.watchers[folder_id] = watcher
             watcher.start()
             logging.info(f"Started watcher for folder {folder_id}: {path}")
@@ -148,6 +418,7 @@ class FolderWatcherManager:
         watcher = self.watchers.get(folder_id)
         if watcher:
             watcher.stop_flag = True
+            self.scheduler.cancel_folder(folder_id)
             logging.info(f"Stopped watcher for folder {folder_id}")
             del self.watchers[folder_id]
 
@@ -155,5 +426,17 @@ class FolderWatcherManager:
         for watcher in self.watchers.values():
             watcher.stop_flag = True
         self.watchers.clear()
+        self.scheduler.stop()
+        self.archiver.stop(drain_timeout=settings.ARCHIVE_DRAIN_SECONDS)
         logging.info("All watchers stopped")
 
+    def stats(self) -> dict:
+        """Ingestion queue/worker metrics plus the folders being watched."""
+        return {
+            **self.scheduler.stats(),
+            "watchers": len(self.watchers),
+            "failing_files": sum(w.failing_files() for w in list(self.watchers.values())),
+            "encodings": encodings.stats(),
+            "archiver": self.archiver.stats(),
+        }
+
@@ -16,7 +16,10 @@ logging.basicConfig(
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.database.connection import Base, engine
+from app.database.migrations import add_missing_columns
 from app.services.watcher import FolderWatcherManager
+from app.services.tableregistry import table_registry
+from app.appsettings.config import settings
 from routes import (
     folder as folder_router,
     auth as auth_router,
@@ -30,12 +33,14 @@ import asyncio
 
 # Create DB tables
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine)
 
 manager = FolderWatcherManager()
 folder_router.manager = manager  # inject manager into router for start/stop
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    table_registry.start(engine, settings.TABLE_REGISTRY_REFRESH_SECONDS)
     # start watchers for any already-registered active folders
     manager.start_for_all()
     try:
@@ -44,6 +49,7 @@ async def lifespan(app: FastAPI):
         # Ignore cancellation during shutdown
         pass
     finally:
+        table_registry.stop()
         await manager.shutdown()
 
 app = FastAPI(title="Realtime Scanning Data Management", lifespan=lifespan)
@@ -1,32 +1,68 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from app.database.connection import get_db
-from app.services.dashboard import get_total_users, get_active_users, get_total_data_rows,get_todays_data_rows,get_total_rows_per_scanner,get_todays_rows_per_scanner
+from app.database.connection import SessionLocal, get_db
+from app.services.dashboard import get_total_users, get_active_users, get_total_data_rows,get_todays_data_rows,get_total_rows_per_scanner,get_todays_rows_per_scanner, get_summary
+from app.services.dashboardcache import dashboard_cache
+from app.services.approxcounts import (
+    approx_total_data_rows, approx_todays_data_rows, record_exact_total, record_exact_today,
+)
+from app.services.events import ingest_events
 from app.services.auth import get_current_user
 from app.database.models.users import User
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+STREAM_HEARTBEAT_SECONDS = 30
+
+
+def _check_dates(*values: str | None) -> None:
+    for value in values:
+        if value:
+            try:
+                date.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid date '{value}', expected YYYY-MM-DD")
+
 @router.get("/totalusers")
 def total_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    total = get_total_users(db)
+    total = dashboard_cache.get("totalusers", lambda: get_total_users(db), tables=())
     return {"success": True, "total_users": total}
 
 @router.get("/activeusers")
 def active_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    active = get_active_users(db)
+    active = dashboard_cache.get("activeusers", lambda: get_active_users(db), tables=())
     return {"success": True, "active_users": active}
 
 @router.get("/totalfilescanned")
-def total_data_rows(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    total_rows = get_total_data_rows(db)
-    return {"success": True, "total_data_rows": total_rows}
+def total_data_rows(exact: bool = True, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    def compute():
+        if not exact:
+            return {"success": True, "approximate": True, **approx_total_data_rows(db)}
+        skipped = []
+        total_rows = get_total_data_rows(db, skipped)
+        if not skipped:
+            record_exact_total(db, total_rows)
+        return {"success": True, "approximate": False, "total_data_rows": total_rows, "skipped_tables": skipped}
+
+    return dashboard_cache.get(("totalfilescanned", exact), compute)
     
 
 @router.get("/todaysfilescanned")
-def todays_data_rows(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    total_rows = get_todays_data_rows(db)
-    return {"success": True, "todays_data_rows": total_rows}
+def todays_data_rows(exact: bool = True, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    def compute():
+        if not exact:
+            return {"success": True, "approximate": True, **approx_todays_data_rows(db)}
+        skipped = []
+        total_rows = get_todays_data_rows(db, skipped)
+        if not skipped:
+            record_exact_today(db, total_rows)
+        return {"success": True, "approximate": False, "todays_data_rows": total_rows, "skipped_tables": skipped}
+
+    # the date is part of the key so the cache rolls over at midnight
+    return dashboard_cache.get(("todaysfilescanned", date.today(), exact), compute)
 
 @router.get("/totaldatascannerwise")
 def total_rows_scannerwise(
@@ -35,13 +71,108 @@ def total_rows_scannerwise(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    result = get_total_rows_per_scanner(db, start_date, end_date)
-    return {
-        "success": True,
-        "total_rows_per_scanner": result
-    }
+    _check_dates(start_date, end_date)
+
+    def compute():
+        skipped = []
+        result = get_total_rows_per_scanner(db, start_date, end_date, skipped)
+        return {
+            "success": True,
+            "total_rows_per_scanner": result,
+            "skipped_tables": skipped
+        }
+
+    return dashboard_cache.get(("totaldatascannerwise", start_date, end_date), compute)
 
 @router.get("/todaysdatascannerwise")
 def todays_rows_scannerwise(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    result = get_todays_rows_per_scanner(db)
-    return {"success": True, "todays_data_per_scanner": result}
\ No newline at end of file
+    def compute():
+        skipped = []
+        result = get_todays_rows_per_scanner(db, skipped)
+        return {"success": True, "todays_data_per_scanner": result, "skipped_tables": skipped}
+
+    return dashboard_cache.get(("todaysdatascannerwise", date.today()), compute)
+
+@router.get("/summary")
+def summary(
+    start_date: str | None = None,
+    end_date: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Every tile in one payload; the per-scanner totals honour start_date/end_date."""
+    _check_dates(start_date, end_date)
+
+    def compute():
+        return {"success": True, **get_summary(db, start_date, end_date)}
+
+    return dashboard_cache.get(("summary", date.today(), start_date, end_date), compute)
+
+@router.get("/cachestats")
+def cache_stats(current_user: User = Depends(get_current_user)):
+    return {"success": True, "cache": dashboard_cache.stats()}
+
+async def _send_snapshot(websocket: WebSocket) -> int:
+    """Send the (cached) summary; returns the last event seq it already includes."""
+    def compute():
+        db = SessionLocal()
+        try:
+            # taken with ingest commits held off, so the summary holds exactly the events up to seq
+            return ingest_events.snapshot(lambda: dashboard_cache.get(
+                ("summary", date.today(), None, None),
+                lambda: {"success": True, **get_summary(db)},
+                coalesce=False,
+            ))
+        finally:
+            db.close()
+
+    seq, summary = await run_in_threadpool(compute)
+    await websocket.send_json({"type": "snapshot", "seq": seq, "summary": summary})
+    return seq
+
+
+@router.websocket("/stream")
+async def stream(websocket: WebSocket, token: str):
+    """Summary snapshot on connect, then ingest deltas as file chunks are committed.
+
+    Browsers cannot set headers on a WebSocket, so the bearer token is passed
+    as the `token` query parameter. A new snapshot is sent when the client
+    falls behind or the day changes.
+    """
+    db = SessionLocal()
+    try:
+        await get_current_user(token, db)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    finally:
+        db.close()
+
+    await websocket.accept()
+    sub = ingest_events.subscribe()
+    try:
+        day = date.today()
+        seq = await _send_snapshot(websocket)
+        while True:
+            try:
+                events = [await asyncio.wait_for(sub.queue.get(), STREAM_HEARTBEAT_SECONDS)]
+            except asyncio.TimeoutError:
+                events = []
+            while not sub.queue.empty():
+                events.append(sub.queue.get_nowait())
+
+            if sub.lagged or date.today() != day:
+                sub.lagged = False
+                day = date.today()
+                seq = await _send_snapshot(websocket)
+                continue
+
+            deltas = [e.to_dict() for e in events if e.seq > seq]
+            if deltas:
+                await websocket.send_json({"type": "delta", "events": deltas})
+            elif not events:
+                await websocket.send_json({"type": "heartbeat"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ingest_events.unsubscribe(sub)
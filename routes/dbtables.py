@@ -1,10 +1,21 @@
 import json,os,base64
-from fastapi import APIRouter, Form, Depends, HTTPException
-from sqlalchemy import text
+from fastapi import APIRouter, Form, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy import delete, text
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
+from app.database.models.scanrollup import ScanRollup
+from typing import Literal
 from pydantic import BaseModel
-from app.services.recordsearch import search_record, get_table_columns
+from app.services.recordsearch import search_record, get_table_columns, create_index, plan_search, stream_records, search_all
+from app.services.schemacache import schema_cache
+from app.services.columncatalog import column_catalog
+from app.services.export import MEDIA_TYPES, ExportQuery, export_table, parquet_available
+from app.services.images import BatchItem, image_cache, items_for_records, resolve_batch, resolve_image_path, zip_stream
+from app.services.dashboardcache import dashboard_cache
+from app.services.tablemigrate import SCANNER_ID_TYPE, SYSTEM_INDEXES
+from app.services.tableregistry import table_registry
+from app.appsettings.config import settings
 
 router = APIRouter(prefix="/tables", tags=["Dynamic Tables"])
 
@@ -19,14 +30,29 @@ TYPE_MAP = {
     "boolean": "TINYINT(1)",
 }
 
-EXCLUDED_TABLES = {"folders", "processed_files", "users", "revokedtokens"}
-
-
 class TableSchemaRequest(BaseModel):
     table_name: str
     table_schema: list[dict[str, str]]
 
 
+class ImagePair(BaseModel):
+    csv_path: str
+    image: str
+
+
+class ImageBatchRequest(BaseModel):
+    # either explicit pairs, or record ids of one table plus the columns holding image paths
+    items: list[ImagePair] = []
+    table_name: str | None = None
+    ids: list[int] = []
+    image_columns: list[str] = []
+
+
+class IndexRequest(BaseModel):
+    column_name: str
+    kind: Literal["btree", "fulltext"] = "btree"
+
+
 @router.post("/create")
 async def create_table_from_json(
     body: TableSchemaRequest, db: Session = Depends(get_db)
@@ -52,12 +78,14 @@ async def create_table_from_json(
         # Add system columns
         col_defs.extend(
             [
-                "`ScannerID` TEXT",
+                f"`ScannerID` {SCANNER_ID_TYPE}",
                 "`Processed` TINYINT(1) DEFAULT 0",
                 "`CreatedAt` DATETIME DEFAULT CURRENT_TIMESTAMP",
                 "`CsvPath` VARCHAR(1024)",
             ]
         )
+        # dashboard filters/groups by scanner and CreatedAt range
+        col_defs.extend(SYSTEM_INDEXES)
 
         create_table_sql = f"""
         CREATE TABLE IF NOT EXISTS `{table_name}` (
@@ -68,6 +96,9 @@ async def create_table_from_json(
 
         db.execute(text(create_table_sql))
         db.commit()
+        schema_cache.invalidate(table_name)
+        column_catalog.invalidate(table_name)
+        table_registry.add(table_name)
 
         return {
             "success": True,
@@ -82,14 +113,8 @@ async def create_table_from_json(
 @router.get("/all")
 def get_all_tables(db: Session = Depends(get_db)):
     try:
-        # Fetch all tables in the current database
-        result = db.execute(text("SHOW TABLES;"))
-        tables = [row[0] for row in result.fetchall()]
-
-        # Exclude unwanted tables
-        filtered = [t for t in tables if t.lower() not in EXCLUDED_TABLES]
-
-        return {"success": True, "tables": filtered}
+        # scanner data tables only; system tables are never listed
+        return {"success": True, "tables": table_registry.tables(db.get_bind())}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -99,7 +124,7 @@ def get_all_tables(db: Session = Depends(get_db)):
 async def delete_table(table_name: str, db: Session = Depends(get_db)):
     try:
         # Prevent deleting system tables
-        if table_name.lower() in EXCLUDED_TABLES:
+        if table_registry.is_system_table(table_name):
             raise HTTPException(
                 status_code=400,
                 detail=f"Deletion of system table '{table_name}' is not allowed.",
@@ -116,7 +141,12 @@ async def delete_table(table_name: str, db: Session = Depends(get_db)):
         # Drop the table
         drop_sql = f"DROP TABLE `{table_name}`"
         db.execute(text(drop_sql))
+        db.execute(delete(ScanRollup).where(ScanRollup.table_name == table_name))
         db.commit()
+        schema_cache.invalidate(table_name)
+        column_catalog.invalidate(table_name)
+        table_registry.remove(table_name)
+        dashboard_cache.invalidate(table_name)
 
         return {
             "success": True,
@@ -135,32 +165,182 @@ def search_in_table(
     table_name: str,
     column_name: str,
     search_value: str,
+    mode: Literal["exact", "prefix", "contains"] = "contains",
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    explain: bool = False,
     db: Session = Depends(get_db)
 ):
     try:
-        results = search_record(db, table_name, column_name, search_value)
-        if not results:
+        results, planned_access, next_cursor = search_record(
+            db, table_name, column_name, search_value, mode, limit, cursor, explain
+        )
+        if not results and not cursor:
             raise HTTPException(status_code=404, detail="No matching records found")
-        return {"success": True, "results": results}
+        return {"success": True, "results": results, "planned_access": planned_access, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/image")
-def get_image_base64(
+@router.get("/searchall")
+def search_all_tables(
+    column_name: str,
+    search_value: str,
+    mode: Literal["exact", "prefix", "contains"] = "exact",
+    limit: int = Query(100, ge=1, le=1000),
+    deadline_seconds: float = Query(settings.SEARCH_DEADLINE_SECONDS, gt=0, le=60),
+    db: Session = Depends(get_db)
+):
+    """Search every data table that has `column_name`; each result carries its table."""
+    try:
+        result = search_all(db, column_name, search_value, mode, limit, deadline_seconds)
+        return {"success": True, **result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/searchrecord/stream")
+def stream_search(
+    table_name: str,
+    column_name: str,
+    search_value: str,
+    mode: Literal["exact", "prefix", "contains"] = "contains",
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """All matches as NDJSON (one row per line), streamed without buffering the result set."""
+    try:
+        plan = plan_search(db, table_name, column_name, search_value, mode)
+        rows = stream_records(db.get_bind(), plan, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        rows,
+        media_type="application/x-ndjson",
+        headers={"X-Planned-Access-Path": plan.access["path"]},
+    )
+
+
+@router.post("/{table_name}/indexes")
+def add_search_index(table_name: str, body: IndexRequest, db: Session = Depends(get_db)):
+    """btree backs exact/prefix search, fulltext (ngram parser) backs contains search."""
+    if table_name not in table_registry.tables(db.get_bind()):
+        raise HTTPException(status_code=404, detail=f"Table '{table_name}' does not exist")
+    try:
+        index_name = create_index(db, table_name, body.column_name, body.kind)
+        return {"success": True, "table_name": table_name, "index_name": index_name, "kind": body.kind}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{table_name}/export")
+def export_table_rows(
+    table_name: str,
+    format: Literal["csv", "jsonl", "parquet"] = "csv",
+    scanner_id: str | None = None,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    gzip: bool = False,
+    db: Session = Depends(get_db)
+):
+    """Stream the (filtered) table as CSV, JSONL or Parquet without buffering it."""
+    if table_name not in table_registry.tables(db.get_bind()):
+        raise HTTPException(status_code=404, detail=f"Table '{table_name}' does not exist")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export needs pyarrow installed")
+    try:
+        query = ExportQuery(table_name, scanner_id, start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    gzip = gzip and format != "parquet"
+    filename = f"{table_name}.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export_table(db.get_bind(), query, format, gzip),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/image/file")
+def get_image_file(
     csv_path: str,
-    front_side_image: str
+    front_side_image: str,
+    if_none_match: str | None = Header(None),
+    if_modified_since: str | None = Header(None),
 ):
+    """Raw image bytes with ETag/Last-Modified; Range requests are served by FileResponse."""
     try:
-        base_dir = os.path.dirname(csv_path)
-        parent_dir = os.path.dirname(base_dir)
+        info = image_cache.get(csv_path, front_side_image)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-        img_relative = "/".join(front_side_image.split("/")[-2:])  # Use '/' everywhere
+    if info.not_modified(if_none_match, if_modified_since):
+        return Response(status_code=304, headers=info.headers())
+    # the body's length and validators must match the file as it is now
+    try:
+        info = image_cache.restat(csv_path, front_side_image, info)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return FileResponse(
+        info.path,
+        media_type=info.content_type,
+        headers=info.headers(),
+        stat_result=info.stat,
+    )
+
+
+@router.get("/image/cachestats")
+def image_cache_stats():
+    return {"success": True, "cache": image_cache.stats()}
+
+
+@router.post("/image/batch")
+def get_image_batch(body: ImageBatchRequest, db: Session = Depends(get_db)):
+    """Zip of many images plus manifest.json with a per-item status; missing images do not fail the batch."""
+    items = [BatchItem(pair.csv_path, pair.image) for pair in body.items]
+    if body.ids:
+        if not body.table_name or body.table_name not in table_registry.tables(db.get_bind()):
+            raise HTTPException(status_code=404, detail=f"Table '{body.table_name}' does not exist")
+        known = column_catalog.get(db, body.table_name).name_set
+        unknown = [c for c in ["CsvPath", *body.image_columns] if c not in known]
+        if unknown or not body.image_columns:
+            raise HTTPException(status_code=400, detail=f"Invalid image columns: {unknown or 'none given'}")
+        items += items_for_records(db, body.table_name, body.ids, body.image_columns)
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No images requested")
+    if len(items) > settings.IMAGE_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.IMAGE_BATCH_MAX_ITEMS} images per batch")
+
+    resolve_batch(items)
+    return StreamingResponse(
+        zip_stream(items),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="images.zip"'},
+    )
 
-        image_path = os.path.join(parent_dir, img_relative)
 
-        # Normalize path to avoid issues
-        image_path = os.path.normpath(image_path)
+@router.get("/image")
+def get_image_base64(
+    csv_path: str,
+    front_side_image: str
+):
+    """Base64 in JSON, kept for existing clients; prefer /tables/image/file."""
+    try:
+        image_path = resolve_image_path(csv_path, front_side_image)
 
         if not os.path.exists(image_path):
             raise HTTPException(status_code=404, detail=f"Image not found at {image_path}")
@@ -189,5 +369,7 @@ def get_columns_from_table(
     return {
         "success": True,
         "table_name": table_name,
-        "columns": columns
+        "columns": columns,
+        # name, type and indexes led by the column
+        "column_info": column_catalog.get(db, table_name).describe()
     }
\ No newline at end of file
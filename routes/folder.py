@@ -1,9 +1,10 @@
 import os,logging
+from typing import Literal, Optional
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from app.database.connection import get_db
-from app.services.folderoperations import add_folder, list_folders, deactivate_folder
+from app.services.folderoperations import add_folder, list_folders, deactivate_folder, seed_jobs
 from app.services.watcher import FolderWatcherManager
 from app.services.auth import get_current_user
 from app.database.models import users, folders  # make sure Folder is imported
@@ -16,6 +17,8 @@ class FolderIn(BaseModel):
     path: str
     scanner_id: str
     table_name: str
+    ingest_mode: Optional[Literal["batch", "bulk"]] = None  # None -> per-table/global default
+    watch_mode: Optional[Literal["auto", "events", "poll"]] = None  # None -> WATCH_MODE
 
 
 @router.post("/add")
@@ -24,10 +27,34 @@ def add_watch_folder(
     db: Session = Depends(get_db),
     user: users.User = Depends(get_current_user),
 ):
-    folder = add_folder(db, body.path, body.scanner_id, body.table_name)
+    folder = add_folder(db, body.path, body.scanner_id, body.table_name, body.ingest_mode, body.watch_mode)
     if manager:
         manager.start(folder.id, folder.path)
-    return {"id": folder.id, "path": folder.path, "active": folder.active}
+    seed = seed_jobs.get(folder.id)
+    return {
+        "id": folder.id,
+        "path": folder.path,
+        "active": folder.active,
+        "seed": seed.to_dict() if seed else None,
+    }
+
+
+@router.get("/{folder_id}/seed")
+def seed_status(
+    folder_id: int,
+    user: users.User = Depends(get_current_user),
+):
+    seed = seed_jobs.get(folder_id)
+    if not seed:
+        raise HTTPException(status_code=404, detail="No seeding job for this folder")
+    return {"success": True, "seed": seed.to_dict()}
+
+
+@router.get("/stats")
+def ingest_stats(user: users.User = Depends(get_current_user)):
+    if not manager:
+        raise HTTPException(status_code=503, detail="Watcher manager not available")
+    return {"success": True, "stats": manager.stats()}
 
 
 @router.get("/list")
@@ -36,7 +63,7 @@ def list_watch_folders(
     user: users.User = Depends(get_current_user),
 ):
     folders = list_folders(db)
-    return [{"id": f.id, "path": f.path, "active": f.active, "scanner_id":f.scanner_id,"table_name":f.table_name} for f in folders]
+    return [{"id": f.id, "path": f.path, "active": f.active, "scanner_id":f.scanner_id,"table_name":f.table_name,"ingest_mode":f.ingest_mode,"watch_mode":f.watch_mode,"encoding":f.encoding} for f in folders]
 
 
 @router.post("/{folder_id}/activate")
@@ -73,15 +100,18 @@ def deactivate_watch_folder(
 
     watcher = manager.watchers[folder_id]
 
+    # Stop discovery, take the folder out of the shared queue and let its running job finish
+    watcher.stop_flag = True
+    manager.scheduler.cancel_folder(folder_id, wait=True)
+
     #  Process all remaining CSVs synchronously before stopping
     try:
         files = sorted([f for f in os.listdir(folder.path) if f.endswith(".csv")])
 
         for fname in files:
             file_path = os.path.join(folder.path, fname)
-            if fname not in watcher.processed_files:
+            if not watcher.is_processed(file_path):
                 watcher.process_csv(file_path)
-                watcher.processed_files.add(fname)
 
     except Exception as e:
         logging.error(f"Error while processing remaining files for folder {folder_id}: {e}")
@@ -115,8 +145,7 @@ def delete_folder(
 
     # Stop watcher if running
     if manager and folder_id in manager.watchers:
-        manager.watchers[folder_id].stop_flag = True
-        manager.watchers.pop(folder_id, None)
+        manager.stop(folder_id)
         logging.info(f" Watcher stopped for folder {folder_id}")
 
     # Delete from DB